@@ -4,22 +4,28 @@ import os
 import datetime
 import tempfile
 import io
-from database import get_warehouse_data
+from database import (get_daily_trends_sql, get_stage_histogram_sql,
+                      get_warehouse_data, get_warehouse_performance_sql,
+                      start_order_maintenance, start_warehouse_kpi_refresher)
 
-# Try to initialize the database with sample data if not already set up
+# Try to initialize the database with sample data if not already set up.
+# This only talks to the database on the first run in this process.
 import setup_database
+from db_pool import PoolTimeout
 try:
-    setup_database.setup_database()
+    setup_database.ensure_database_setup()
+    # Keep the daily rollup, the order partitions and the optional warehouse
+    # KPI materialized view up to date in the background
+    start_order_maintenance()
+    start_warehouse_kpi_refresher()
 except Exception as e:
     st.warning(f"Database setup failed: {e}. Using sample data instead.")
-from data_processor import (calculate_avg_handling_time,
-                            calculate_delay_percentage,
-                            calculate_fulfillment_rate,
-                            get_warehouse_performance)
+from data_processor import (WAREHOUSE_KEYS, compute_kpis, encode_categoricals,
+                            kpis_from_groups, prepare_frame, required_columns)
 from visualizations import (create_heatmap, create_bottleneck_chart,
                             create_performance_comparison,
                             create_time_series_chart)
-from utils import get_date_range, filter_data_by_team
+from utils import get_date_range, filter_data_by_team, get_team_presets
 from sample_data import get_sample_data
 
 # Initialize session state variables
@@ -57,7 +63,7 @@ st.sidebar.title("Dashboard Controls")
 # Team presets
 team_preset = st.sidebar.selectbox(
     "Select Team Preset",
-    ["All Teams", "Brand Team", "Performance Team", "Social Media Team"])
+    get_team_presets())
 
 # Date range selector
 date_range = st.sidebar.date_input("Select Date Range",
@@ -73,6 +79,10 @@ if len(date_range) == 2:
 
     # Data source selector
     data_source = None
+    df = None
+    warehouse_performance = None
+    stage_histogram = None
+    trend_data = None
 
     # Check if we have uploaded data
     if st.session_state['uploaded_data'] is not None:
@@ -86,22 +96,69 @@ if len(date_range) == 2:
         data_source = "sample"
     # Otherwise use database
     else:
-        # Our improved get_warehouse_data will automatically return sample data if database fails
-        df = get_warehouse_data(start_date, end_date)
-        
-        # Set the data source flag for downstream processing
-        # Sample data shows a warning in get_warehouse_data function
         data_source = "database"
+        try:
+            # Aggregate in the database: the headline KPIs are computed from the
+            # per-warehouse metrics, so order rows are only fetched for the
+            # views whose SQL path failed (e.g. a preset SQL can't filter on)
+            warehouse_performance = get_warehouse_performance_sql(
+                start_date, end_date, team_preset)
+            if warehouse_performance is not None:
+                stage_histogram = get_stage_histogram_sql(
+                    start_date, end_date, team_preset)
+                trend_data = get_daily_trends_sql(start_date, end_date, team_preset)
+
+            views = []
+            if warehouse_performance is None:
+                views += ['kpis', 'warehouse_performance']
+            if stage_histogram is None:
+                views.append('bottlenecks')
+            if trend_data is None:
+                views.append('trends')
+            if views:
+                # Our improved get_warehouse_data will automatically return sample data if database fails.
+                # Only the columns read by those views are fetched, and only
+                # the selected team's rows
+                df = get_warehouse_data(start_date, end_date,
+                                        columns=required_columns(views),
+                                        team_preset=team_preset)
+
+                # Sample data shows a warning in get_warehouse_data function;
+                # don't mix it with database aggregates
+                if df.attrs.get('source') == 'sample':
+                    data_source = "sample"
+                    warehouse_performance = stage_histogram = trend_data = None
+        except PoolTimeout:
+            # Every pooled connection stayed busy; say so instead of
+            # showing sample data as if the database were down
+            st.error("The database is busy right now. Please try again in a moment.")
+            data_source = "busy"
 
     # Apply team-specific filters based on preset if not using uploaded data
-    if data_source != "uploaded":
-        df = filter_data_by_team(df, team_preset)
+    if data_source not in ("uploaded", "busy"):
+        if df is not None:
+            # Normalize dtypes and derive helper columns once; the filtered
+            # frame and every metric and chart below reuse them
+            df = prepare_frame(df)
+            # Database rows come already filtered by the team preset
+            if df.attrs.get('team_preset') != team_preset:
+                df = filter_data_by_team(df, team_preset)
+
+        if warehouse_performance is not None:
+            has_data = warehouse_performance['order_count'].sum() > 0
+        else:
+            has_data = not df.empty
 
-        if not df.empty:
-            # Calculate key metrics
-            avg_handling_time = calculate_avg_handling_time(df)
-            delay_percentage = calculate_delay_percentage(df)
-            fulfillment_rate = calculate_fulfillment_rate(df)
+        if has_data:
+            if warehouse_performance is not None:
+                # Weight the database's per-warehouse metrics by order count
+                kpis = kpis_from_groups(warehouse_performance)
+            else:
+                # Key metrics and per-warehouse metrics in one pass
+                kpis, warehouse_performance = compute_kpis(df, by=WAREHOUSE_KEYS)
+            avg_handling_time = kpis['avg_handling_time']
+            delay_percentage = kpis['delay_percentage']
+            fulfillment_rate = kpis['fulfillment_rate']
 
             # Show key metrics in a row
             col1, col2, col3 = st.columns(3)
@@ -113,11 +170,12 @@ if len(date_range) == 2:
             with col3:
                 st.metric("Fulfillment Rate", f"{fulfillment_rate:.1f}%")
 
-            # Calculate warehouse performance data
-            warehouse_performance = get_warehouse_performance(df)
-
             # Main dashboard content
             st.subheader("Warehouse Performance Analysis")
+            kpis_refreshed_at = warehouse_performance.attrs.get('refreshed_at')
+            if kpis_refreshed_at is not None:
+                st.caption("Warehouse metrics as of " +
+                           kpis_refreshed_at.strftime("%Y-%m-%d %H:%M"))
 
             tab1, tab2, tab3, tab4 = st.tabs(
                 ["Bottlenecks", "Heatmap", "Comparisons", "Trends"])
@@ -132,7 +190,8 @@ if len(date_range) == 2:
                 Higher bars indicate more orders in that stage, while the red line shows average processing time.
                 Stages with high processing times represent operational bottlenecks that need optimization.
                 """)
-                fig = create_bottleneck_chart(df)
+                # Uses the database's stage histogram when there is one
+                fig = create_bottleneck_chart(df, stage_histogram=stage_histogram)
                 st.plotly_chart(fig, use_container_width=True)
 
                 # List the slowest warehouses
@@ -178,7 +237,8 @@ if len(date_range) == 2:
                 Monitor for seasonal patterns, sudden spikes in processing time, or volume increases that affect performance.
                 Use this to predict future bottlenecks and plan capacity accordingly.
                 """)
-                fig = create_time_series_chart(df)
+                # Uses the database's daily rollup when there is one
+                fig = create_time_series_chart(df, trend_data=trend_data)
                 st.plotly_chart(fig, use_container_width=True)
 
             # Insights and recommendations
@@ -259,7 +319,7 @@ if uploaded_file is not None:
 
         # Process the uploaded Excel file
         import pandas as pd
-        uploaded_df = pd.read_excel(tmp_path)
+        uploaded_df = encode_categoricals(pd.read_excel(tmp_path))
         st.sidebar.success(f"Uploaded {uploaded_file.name} successfully!")
 
         # Display preview in sidebar with max rows
@@ -279,13 +339,27 @@ st.sidebar.markdown("### Export Options")
 # Export as Excel functionality
 if st.sidebar.button("Export as Excel"):
     # Create Excel file in memory
-    if 'df' in locals() and not df.empty:
+    # The dashboard only fetched the aggregates and columns it displays;
+    # export every column of the database rows
+    export_df = None
+    if 'data_source' in locals() and data_source in ("database", "busy"):
+        try:
+            export_df = prepare_frame(
+                get_warehouse_data(start_date, end_date, team_preset=team_preset))
+            if export_df.attrs.get('team_preset') != team_preset:
+                export_df = filter_data_by_team(export_df, team_preset)
+        except PoolTimeout:
+            st.sidebar.error("The database is busy right now. Please try again in a moment.")
+    elif 'df' in locals() and df is not None:
+        export_df = df
+
+    if export_df is not None and not export_df.empty:
         import io
         buffer = io.BytesIO()
 
         # Create Excel writer with Pandas
         with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Warehouse Data', index=False)
+            export_df.to_excel(writer, sheet_name='Warehouse Data', index=False)
 
         # Download button
         st.sidebar.download_button(label="Download Excel File",
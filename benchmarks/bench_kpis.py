@@ -0,0 +1,114 @@
+"""
+Benchmark the fused KPI pass (data_processor.compute_kpis) against the path
+it replaced: the three calculate_* functions plus the pandas groupby
+get_warehouse_performance.
+
+    python benchmarks/bench_kpis.py --rows 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processor import (WAREHOUSE_KEYS, add_performance_score, calculate_avg_handling_time,
+                            calculate_delay_percentage, calculate_fulfillment_rate, compute_kpis,
+                            delayed_values, fulfilled_values, prepare_frame,
+                            processing_time_values)
+from sample_data import generate_sample_data
+
+def groupby_warehouse_performance(df):
+    """
+    get_warehouse_performance as it was before compute_kpis: per-order
+    values grouped with DataFrame.groupby
+    """
+    if df.empty:
+        return pd.DataFrame()
+    
+    metrics = pd.DataFrame({
+        'processing_time_numeric': processing_time_values(df),
+        'is_delayed': delayed_values(df),
+        'is_fulfilled': fulfilled_values(df),
+        'order_id': df['order_id'].to_numpy()
+    }, index=df.index)
+    
+    keys = [df['warehouse_id'], df['warehouse_name'], df['warehouse_location']]
+    warehouse_performance = metrics.groupby(keys, observed=True).agg({
+        'processing_time_numeric': 'mean',
+        'is_delayed': 'mean',
+        'is_fulfilled': 'mean',
+        'order_id': 'count'
+    }).reset_index()
+    
+    warehouse_performance.columns = [
+        'warehouse_id', 'warehouse_name', 'warehouse_location',
+        'avg_processing_time', 'delay_rate', 'fulfillment_rate', 'order_count'
+    ]
+    
+    warehouse_performance['delay_rate'] = warehouse_performance['delay_rate'] * 100
+    warehouse_performance['fulfillment_rate'] = warehouse_performance['fulfillment_rate'] * 100
+    
+    return add_performance_score(warehouse_performance)
+
+def old_kpis(df):
+    overall = {
+        'avg_handling_time': calculate_avg_handling_time(df),
+        'delay_percentage': calculate_delay_percentage(df),
+        'fulfillment_rate': calculate_fulfillment_rate(df),
+    }
+    return overall, groupby_warehouse_performance(df)
+
+def new_kpis(df):
+    return compute_kpis(df, by=WAREHOUSE_KEYS)
+
+def best_time(func, df, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(df)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def check_same(old, new):
+    """
+    Raise AssertionError unless both paths give the same KPIs
+    """
+    old_overall, old_groups = old
+    new_overall, new_groups = new
+    for name, value in old_overall.items():
+        assert np.isclose(value, new_overall[name]), name
+    
+    columns = ['avg_processing_time', 'delay_rate', 'fulfillment_rate', 'order_count']
+    old_groups = old_groups.sort_values('warehouse_id').reset_index(drop=True)
+    new_groups = new_groups.sort_values('warehouse_id').reset_index(drop=True)
+    assert list(old_groups['warehouse_id']) == list(new_groups['warehouse_id'])
+    assert np.allclose(old_groups[columns].to_numpy(dtype=float),
+                       new_groups[columns].to_numpy(dtype=float))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000],
+                        help="order counts to benchmark")
+    parser.add_argument("--warehouses", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per path; the best time is reported")
+    args = parser.parse_args()
+    
+    print(f"{'rows':>12} {'old (s)':>10} {'compute_kpis (s)':>17} {'speedup':>8}")
+    for rows in args.rows:
+        df = prepare_frame(generate_sample_data(num_orders=rows, num_warehouses=args.warehouses,
+                                                num_products=args.products))
+        old_seconds, old = best_time(old_kpis, df, args.repeat)
+        new_seconds, new = best_time(new_kpis, df, args.repeat)
+        check_same(old, new)
+        print(f"{rows:>12,} {old_seconds:>10.3f} {new_seconds:>17.3f} "
+              f"{old_seconds / new_seconds:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,178 @@
+import threading
+
 import pandas as pd
 import numpy as np
 
+# Columns identifying a warehouse in per-warehouse metrics
+WAREHOUSE_KEYS = ['warehouse_id', 'warehouse_name', 'warehouse_location']
+
+# Order columns each dashboard view reads, so the database query can
+# select just what the displayed views need
+VIEW_COLUMNS = {
+    'kpis': ['processing_time', 'expected_delivery_date', 'actual_delivery_date',
+             'is_fulfilled'],
+    'warehouse_performance': WAREHOUSE_KEYS + ['processing_time', 'expected_delivery_date',
+                                               'actual_delivery_date', 'is_fulfilled'],
+    'bottlenecks': ['processing_time'],
+    'trends': ['order_id', 'order_date', 'processing_time'],
+}
+
+# Processing stage definitions shared by the bottleneck chart, the bottleneck
+# analysis and the database stage histogram, so every path bins orders the
+# same way. Stage i covers edges[i]..edges[i + 1]; 'closed' says which end is
+# included. Pass another table of the same shape as `stages` to rebin.
+PROCESS_STAGES = {
+    'labels': ['Order Receipt', 'Picking', 'Packing', 'Quality Check', 'Shipping'],
+    'edges': [0, 1, 3, 6, 10, float('inf')],
+    'closed': 'left',
+}
+
+# Low-cardinality string columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['warehouse_name', 'warehouse_location', 'team_assignment',
+                       'product_category', 'brand', 'order_status']
+
+# Categories seen so far per column. They only ever grow by appending, so
+# the codes of existing values stay the same across refreshes.
+_known_categories = {}
+_categories_lock = threading.Lock()
+
+def _register_categories(column, values):
+    with _categories_lock:
+        known = _known_categories.setdefault(column, [])
+        seen = set(known)
+        for value in values:
+            if value not in seen:
+                known.append(value)
+                seen.add(value)
+        return list(known)
+
+def encode_categoricals(df, columns=None):
+    """
+    Convert low-cardinality string columns to categoricals with category sets
+    that are stable across refreshes, so repeated values are stored once and
+    groupbys run on integer codes. Returns a new frame.
+    """
+    if df is None:
+        return None
+    
+    encoded = {}
+    for col in columns or CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        column = df[col]
+        is_categorical = isinstance(column.dtype, pd.CategoricalDtype)
+        values = column.cat.categories if is_categorical else pd.unique(column.dropna())
+        categories = _register_categories(col, values)
+        
+        current = list(column.cat.categories) if is_categorical else None
+        if current == categories:
+            continue
+        if current is not None and current == categories[:len(current)]:
+            # Appending categories leaves the codes untouched
+            encoded[col] = column.cat.set_categories(categories)
+        else:
+            encoded[col] = pd.Categorical(column, categories=categories)
+    
+    return df.assign(**encoded) if encoded else df
+
+def required_columns(views, extra=()):
+    """
+    Return the order columns read by the given VIEW_COLUMNS views plus any
+    extra columns, without duplicates
+    """
+    columns = []
+    for column in [col for view in views for col in VIEW_COLUMNS[view]] + list(extra):
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+def prepare_frame(df):
+    """
+    Normalize dtypes and derive the helper columns used by the metric and
+    chart functions, once per frame. Returns a new frame marked as prepared
+    (in df.attrs, which survives filtering) so later calls are no-ops; the
+    input frame is never modified and unchanged columns are shared with it.
+    """
+    if df.attrs.get('prepared'):
+        return df
+    
+    derived = {}
+    
+    # Ensure processing_time is numeric
+    if 'processing_time' in df.columns:
+        derived['processing_time_numeric'] = processing_time_values(df)
+    
+    # Convert date columns to datetime if they aren't already
+    for col in ['order_date', 'expected_delivery_date', 'actual_delivery_date']:
+        if col in df.columns:
+            derived[col] = _datetime_values(df, col)
+    
+    # Add delay flag
+    if 'expected_delivery_date' in df.columns and 'actual_delivery_date' in df.columns:
+        derived['is_delayed'] = delayed_values(df)
+    
+    if 'is_fulfilled' in df.columns:
+        derived['is_fulfilled'] = fulfilled_values(df)
+    elif 'order_status' in df.columns:
+        # Alternative flag using order_status if is_fulfilled isn't available
+        derived['fulfilled'] = fulfilled_values(df)
+    
+    # Add date features
+    if 'order_date' in derived:
+        derived['date'] = pd.Series(derived['order_date'], index=df.index).dt.date
+    
+    prepared = df.assign(**derived)
+    prepared.attrs['prepared'] = True
+    return prepared
+
+def _datetime_values(df, col):
+    if pd.api.types.is_datetime64_any_dtype(df[col]):
+        return df[col].to_numpy()
+    return pd.to_datetime(df[col], errors='coerce').to_numpy()
+
+def processing_time_values(df):
+    """
+    Processing times in hours as a float array (NaN where not numeric)
+    """
+    if 'processing_time_numeric' in df.columns:
+        return df['processing_time_numeric'].to_numpy()
+    return pd.to_numeric(df['processing_time'], errors='coerce').to_numpy(dtype=float)
+
+def delayed_values(df):
+    """
+    1 for orders delivered after their expected date, else 0
+    """
+    if 'is_delayed' in df.columns:
+        return df['is_delayed'].to_numpy()
+    actual = _datetime_values(df, 'actual_delivery_date')
+    expected = _datetime_values(df, 'expected_delivery_date')
+    # NaT compares as False, so undelivered orders are not delayed
+    return (actual > expected).astype(int)
+
+def fulfilled_values(df):
+    """
+    1 for fulfilled orders, else 0 (NaN for unrecognized is_fulfilled values).
+    Falls back to order_status if is_fulfilled isn't available.
+    """
+    if 'is_fulfilled' in df.columns:
+        if not pd.api.types.is_numeric_dtype(df['is_fulfilled']):
+            # Convert to integer/boolean if it's a string
+            return df['is_fulfilled'].map({'True': 1, 'False': 0, True: 1, False: 0}).to_numpy(dtype=float)
+        return df['is_fulfilled'].to_numpy()
+    if 'fulfilled' in df.columns:
+        return df['fulfilled'].to_numpy()
+    fulfilled_statuses = ['delivered', 'completed', 'fulfilled']
+    return df['order_status'].str.lower().isin(fulfilled_statuses).astype(int).to_numpy()
+
 def calculate_avg_handling_time(df):
     """
     Calculate the average handling time (in hours) for all orders
     """
-    # Ensure processing_time is numeric
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
+    times = processing_time_values(df)
+    times = times[~np.isnan(times)]
     
     # Calculate average handling time in hours
-    avg_time = df['processing_time_numeric'].mean()
-    
-    return avg_time if not pd.isna(avg_time) else 0
+    return times.mean() if len(times) else 0
 
 def calculate_delay_percentage(df):
     """
@@ -20,16 +181,8 @@ def calculate_delay_percentage(df):
     if df.empty:
         return 0
     
-    # Convert date columns to datetime if they aren't already
-    for col in ['expected_delivery_date', 'actual_delivery_date']:
-        if df[col].dtype != 'datetime64[ns]':
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    # Calculate delays
-    df['is_delayed'] = (df['actual_delivery_date'] > df['expected_delivery_date']).astype(int)
-    
     # Calculate delay percentage
-    delay_percentage = (df['is_delayed'].sum() / len(df)) * 100
+    delay_percentage = (delayed_values(df).sum() / len(df)) * 100
     
     return delay_percentage
 
@@ -40,63 +193,227 @@ def calculate_fulfillment_rate(df):
     if df.empty:
         return 0
     
-    # Ensure is_fulfilled is properly cast to avoid type errors
-    if 'is_fulfilled' in df.columns:
-        # Convert to integer/boolean if it's a string
-        if df['is_fulfilled'].dtype == 'object':
-            df['is_fulfilled'] = df['is_fulfilled'].map({'True': 1, 'False': 0, True: 1, False: 0})
+    fulfill_rate = (np.nansum(fulfilled_values(df)) / len(df)) * 100
+    return fulfill_rate
+
+# Additive per-group sums the KPIs are computed from
+KPI_SUM_COLUMNS = ['order_count', 'time_sum', 'time_count', 'delayed_sum',
+                   'fulfilled_sum', 'fulfilled_count']
+
+def compute_kpis(df, by=None):
+    """
+    Compute the headline KPIs (mean processing time, delay rate, fulfillment
+    rate, order count and performance score) in a single grouped pass.
+    
+    Returns (overall, groups): overall is a dict with the same values as
+    calculate_avg_handling_time, calculate_delay_percentage and
+    calculate_fulfillment_rate (plus order_count and performance_score), and
+    groups is a DataFrame with one row per value of the `by` columns and the
+    columns of get_warehouse_performance, or None if `by` is not given.
+    """
+    return kpis_from_sums(*kpi_sums(df, by=by))
+
+def kpi_sums(df, by=None):
+    """
+    Compute the additive sums behind compute_kpis, which can be added up
+    across chunks of orders. Returns (totals, group_sums): totals is a dict
+    of the KPI_SUM_COLUMNS, and group_sums a DataFrame of the `by` columns
+    and KPI_SUM_COLUMNS (or None if `by` is not given).
+    """
+    times = processing_time_values(df).astype(float)
+    has_time = ~np.isnan(times)
+    delayed = delayed_values(df).astype(float)
+    fulfilled = fulfilled_values(df).astype(float)
+    has_fulfilled = ~np.isnan(fulfilled)
+    
+    # Per-order values that are summed per group; the counts are only
+    # needed when some values are missing
+    columns = {
+        'time_sum': np.where(has_time, times, 0.0),
+        'delayed_sum': delayed,
+        'fulfilled_sum': np.where(has_fulfilled, fulfilled, 0.0),
+    }
+    if not has_time.all():
+        columns['time_count'] = has_time
+    if not has_fulfilled.all():
+        columns['fulfilled_count'] = has_fulfilled
+    
+    group_sums = None
+    if by is not None:
+        codes, keys = _group_codes(df, by)
+        # Rows with missing keys belong to no group
+        in_group = codes >= 0
+        codes = codes[in_group]
         
-        # Calculate fulfillment rate
-        fulfill_rate = (df['is_fulfilled'].sum() / len(df)) * 100
-        return fulfill_rate
-    else:
-        # Alternative calculation using order_status if is_fulfilled isn't available
-        fulfilled_statuses = ['delivered', 'completed', 'fulfilled']
-        df['fulfilled'] = df['order_status'].str.lower().isin(fulfilled_statuses).astype(int)
-        fulfill_rate = (df['fulfilled'].sum() / len(df)) * 100
-        return fulfill_rate
+        sums = {name: np.bincount(codes, weights=values[in_group], minlength=len(keys))
+                for name, values in columns.items()}
+        sums['order_count'] = np.bincount(codes, minlength=len(keys))
+        sums.setdefault('time_count', sums['order_count'])
+        sums.setdefault('fulfilled_count', sums['order_count'])
+        group_sums = keys.assign(**{name: sums[name] for name in KPI_SUM_COLUMNS})
+    
+    totals = {name: values.sum() for name, values in columns.items()}
+    totals['order_count'] = len(df)
+    totals.setdefault('time_count', len(df))
+    totals.setdefault('fulfilled_count', len(df))
+    
+    return totals, group_sums
 
-def get_warehouse_performance(df):
+def kpis_from_sums(totals, group_sums=None):
     """
-    Calculate performance metrics for each warehouse
+    Turn the sums from kpi_sums (or several of them added up) into the
+    (overall, groups) result of compute_kpis
     """
-    if df.empty:
-        return pd.DataFrame()
+    groups = None
+    if group_sums is not None:
+        groups = group_sums.drop(columns=KPI_SUM_COLUMNS)
+        order_count = group_sums['order_count'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            groups['avg_processing_time'] = (group_sums['time_sum'].to_numpy()
+                                             / group_sums['time_count'].to_numpy())
+            groups['delay_rate'] = group_sums['delayed_sum'].to_numpy() / order_count * 100
+            groups['fulfillment_rate'] = (group_sums['fulfilled_sum'].to_numpy()
+                                          / group_sums['fulfilled_count'].to_numpy() * 100)
+        groups['order_count'] = order_count
+        groups = add_performance_score(groups)
     
-    # Ensure processing_time is numeric
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
+    total_count = totals['order_count']
     
-    # Convert date columns to datetime if needed
-    for col in ['expected_delivery_date', 'actual_delivery_date']:
-        if df[col].dtype != 'datetime64[ns]':
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+    overall = {
+        'avg_handling_time': totals['time_sum'] / totals['time_count'] if totals['time_count'] else 0,
+        'delay_percentage': totals['delayed_sum'] / total_count * 100 if total_count else 0,
+        'fulfillment_rate': totals['fulfilled_sum'] / total_count * 100 if total_count else 0,
+        'order_count': total_count,
+    }
+    overall['performance_score'] = (
+        overall['avg_handling_time'] * 0.4 + 
+        overall['delay_percentage'] * 0.4 - 
+        overall['fulfillment_rate'] * 0.2
+    )
     
-    # Add delay flag
-    df['is_delayed'] = (df['actual_delivery_date'] > df['expected_delivery_date']).astype(int)
+    return overall, groups
+
+def kpis_from_groups(groups):
+    """
+    Compute the overall KPIs of compute_kpis from per-warehouse metrics
+    (e.g. database.get_warehouse_performance_sql), weighting each
+    warehouse's averages by its order count. This matches compute_kpis on the
+    same orders as long as no processing time or fulfillment flag is
+    missing, which the orders table doesn't allow.
+    """
+    order_count = groups['order_count'].to_numpy(dtype=float)
+    total_count = order_count.sum()
+    totals = {
+        'order_count': int(total_count),
+        'time_sum': (groups['avg_processing_time'].to_numpy(dtype=float) * order_count).sum(),
+        'time_count': total_count,
+        'delayed_sum': (groups['delay_rate'].to_numpy(dtype=float) / 100 * order_count).sum(),
+        'fulfilled_sum': (groups['fulfillment_rate'].to_numpy(dtype=float) / 100
+                          * order_count).sum(),
+        'fulfilled_count': total_count,
+    }
+    return kpis_from_sums(totals)[0]
+
+def fold_kpis(chunks, by=None):
+    """
+    Compute the compute_kpis result over an iterable of order DataFrames
+    (e.g. database.iter_query_chunks) while holding only one chunk and the
+    running per-group sums in memory at a time
+    """
+    if isinstance(by, str):
+        by = [by]
+    
+    totals = dict.fromkeys(KPI_SUM_COLUMNS, 0)
+    group_sums = None
+    for chunk in chunks:
+        chunk_totals, chunk_group_sums = kpi_sums(chunk, by=by)
+        for name in KPI_SUM_COLUMNS:
+            totals[name] += chunk_totals[name]
+        
+        if chunk_group_sums is None:
+            continue
+        if group_sums is None:
+            group_sums = chunk_group_sums
+        else:
+            # Add the sums of groups seen in both, keeping the new groups
+            group_sums = (pd.concat([group_sums, chunk_group_sums], ignore_index=True)
+                          .groupby(by, sort=True, observed=True)[KPI_SUM_COLUMNS]
+                          .sum().reset_index())
     
-    # Handle is_fulfilled data type
-    if df['is_fulfilled'].dtype == 'object':
-        df['is_fulfilled'] = df['is_fulfilled'].map({'True': 1, 'False': 0, True: 1, False: 0})
+    if by is not None and group_sums is None:
+        group_sums = pd.DataFrame(columns=list(by) + KPI_SUM_COLUMNS)
+    return kpis_from_sums(totals, group_sums)
+
+def _group_codes(df, by):
+    """
+    Number the distinct combinations of the `by` columns in sorted order.
+    Returns (codes, keys): an integer group code per row (-1 where a key is
+    missing) and a DataFrame of the key values for each code.
+    """
+    if isinstance(by, str):
+        by = [by]
+    level_codes = []
+    levels = []
+    for col in by:
+        column = df[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Categoricals already carry integer codes
+            level_codes.append(column.cat.codes.to_numpy())
+            levels.append(column.cat.categories)
+        else:
+            codes, uniques = pd.factorize(column, sort=True)
+            level_codes.append(codes)
+            levels.append(uniques)
     
-    # Group by warehouse and calculate metrics
-    warehouse_performance = df.groupby(['warehouse_id', 'warehouse_name', 'warehouse_location']).agg({
-        'processing_time_numeric': 'mean',
-        'is_delayed': 'mean',
-        'is_fulfilled': 'mean',
-        'order_id': 'count'
-    }).reset_index()
+    # Combine the per-column codes into one mixed-radix code per row
+    sizes = [len(level) for level in levels]
+    combined = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+    for codes, size in zip(level_codes, sizes):
+        combined = combined * size + codes
+        valid &= codes >= 0
     
-    # Rename columns
-    warehouse_performance.columns = [
-        'warehouse_id', 'warehouse_name', 'warehouse_location', 
-        'avg_processing_time', 'delay_rate', 'fulfillment_rate', 'order_count'
-    ]
+    space = int(np.prod(sizes, dtype=np.float64))
+    if space == 0 or not valid.any():
+        # Some key column has no values at all (e.g. all NaN), so no row has a group
+        present = np.empty(0, dtype=np.int64)
+        codes = np.full(len(df), -1, dtype=np.intp)
+    elif space <= max(len(df), 1 << 20):
+        # Small key space: find the combinations present with one bincount
+        present = np.flatnonzero(np.bincount(combined[valid], minlength=space))
+        remap = np.full(space, -1, dtype=np.intp)
+        remap[present] = np.arange(len(present))
+        codes = np.where(valid, remap[np.where(valid, combined, 0)], -1)
+    else:
+        present, inverse = np.unique(combined[valid], return_inverse=True)
+        codes = np.full(len(df), -1, dtype=np.intp)
+        codes[valid] = inverse
     
-    # Convert rates to percentages
-    warehouse_performance['delay_rate'] = warehouse_performance['delay_rate'] * 100
-    warehouse_performance['fulfillment_rate'] = warehouse_performance['fulfillment_rate'] * 100
+    # Decode the present combinations back into key columns
+    keys = {}
+    remainder = present
+    for col, column, level, size in reversed(list(zip(by, [df[c] for c in by], levels, sizes))):
+        remainder, level_code = np.divmod(remainder, size)
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            keys[col] = pd.Categorical.from_codes(level_code, dtype=column.dtype)
+        else:
+            keys[col] = level.take(level_code)
     
-    # Calculate an overall performance score (lower is better)
+    return codes, pd.DataFrame({col: keys[col] for col in by})
+
+def get_warehouse_performance(df):
+    """
+    Calculate performance metrics for each warehouse
+    """
+    if df.empty:
+        return pd.DataFrame()
+    
+    return compute_kpis(df, by=WAREHOUSE_KEYS)[1]
+
+def add_performance_score(warehouse_performance):
+    """
+    Add an overall performance score (lower is better) to per-warehouse metrics
+    """
     warehouse_performance['performance_score'] = (
         warehouse_performance['avg_processing_time'] * 0.4 + 
         warehouse_performance['delay_rate'] * 0.4 - 
@@ -105,46 +422,122 @@ def get_warehouse_performance(df):
     
     return warehouse_performance
 
-def identify_bottlenecks(df):
+def assign_stages(values, stages):
+    """
+    Return the stage index of each processing time in one binary-search pass
+    (-1 for missing values and values outside the stage edges)
+    """
+    edges = np.asarray(stages['edges'], dtype=float)
+    codes = np.digitize(values, edges, right=stages['closed'] == 'right') - 1
+    codes[(codes < 0) | (codes >= len(stages['labels']))] = -1
+    return codes
+
+def summarize_stages(values, stages):
+    """
+    Count orders and average processing time per stage with np.bincount
+    """
+    codes = assign_stages(values, stages)
+    in_stage = codes >= 0
+    num_stages = len(stages['labels'])
+    counts = np.bincount(codes[in_stage], minlength=num_stages)
+    totals = np.bincount(codes[in_stage], weights=values[in_stage], minlength=num_stages)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_time = np.where(counts > 0, totals / counts, 0)
+    
+    return pd.DataFrame({
+        'stage': stages['labels'],
+        'count': counts,
+        'avg_time': avg_time
+    })
+
+def _histogram_stages(stage_histogram, stages=None):
+    """
+    Return the stage table to read a stage histogram with: the table it was
+    binned with (attrs['stages']) unless `stages` is given, else PROCESS_STAGES.
+    Raises ValueError if `stages` is given and the histogram was computed for
+    other stages, since its stage codes only mean something for that table.
+    """
+    binned_with = stage_histogram.attrs.get('stages')
+    if stages is None:
+        return binned_with or PROCESS_STAGES
+    if binned_with is not None and binned_with != stages:
+        raise ValueError(
+            f"Stage histogram was computed for stages {binned_with['labels']}, "
+            f"not {stages['labels']}")
+    return stages
+
+def summarize_stage_histogram(stage_histogram, stages=None):
     """
-    Identify bottlenecks in the warehouse and delivery process
+    Fold a per-warehouse stage histogram (see database.get_stage_histogram_sql)
+    into the per-stage counts and average times of summarize_stages.
+    Raises ValueError if `stages` is given and the histogram was computed
+    for other stages.
     """
+    stages = _histogram_stages(stage_histogram, stages)
+    
+    num_stages = len(stages['labels'])
+    codes = stage_histogram['stage'].to_numpy(dtype=np.intp)
+    counts = np.bincount(codes, weights=stage_histogram['order_count'].to_numpy(dtype=float),
+                         minlength=num_stages)
+    totals = np.bincount(codes, weights=stage_histogram['total_time'].to_numpy(dtype=float),
+                         minlength=num_stages)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_time = np.where(counts > 0, totals / counts, 0)
+    
+    return pd.DataFrame({
+        'stage': stages['labels'],
+        'count': counts.astype(np.int64),
+        'avg_time': avg_time
+    })
+
+def identify_bottlenecks(df, stages=None, stage_histogram=None):
+    """
+    Identify bottlenecks in the warehouse and delivery process.
+    If a stage histogram aggregated in the database is given, it is used
+    instead of the order rows, with the stages it was binned with unless
+    `stages` is given (ValueError if it was computed for other stages).
+    Order rows are binned with `stages`, PROCESS_STAGES by default.
+    """
+    if stage_histogram is not None:
+        stages = _histogram_stages(stage_histogram, stages)
+        return pd.DataFrame({
+            'warehouse_id': stage_histogram['warehouse_id'].to_numpy(),
+            'warehouse_name': stage_histogram['warehouse_name'].to_numpy(),
+            'stage': pd.Categorical.from_codes(stage_histogram['stage'].to_numpy(dtype=int),
+                                               stages['labels'], ordered=True),
+            'count': stage_histogram['order_count'].to_numpy(dtype=np.int64)
+        })
+    
     if df.empty:
         return pd.DataFrame()
     
-    # Create processing stages based on processing time
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
-    
-    # Define processing stages (example)
-    df['stage'] = pd.cut(
-        df['processing_time_numeric'],
-        bins=[0, 2, 6, 12, 24, float('inf')],
-        labels=['Rapid', 'Normal', 'Extended', 'Delayed', 'Critical']
-    )
+    # Assign processing stages based on processing time
+    stages = stages or PROCESS_STAGES
+    codes = assign_stages(processing_time_values(df), stages)
+    stage = pd.Series(pd.Categorical.from_codes(codes, stages['labels'], ordered=True),
+                      index=df.index, name='stage')
     
     # Analyze bottlenecks by warehouse and stage
-    bottleneck_analysis = df.groupby(['warehouse_id', 'warehouse_name', 'stage']).size().reset_index(name='count')
+    keys = [df['warehouse_id'], df['warehouse_name'], stage]
+    bottleneck_analysis = df.groupby(keys, observed=True).size().reset_index(name='count')
     
     return bottleneck_analysis
 
-def analyze_trends(df):
+def analyze_trends(df, trend_data=None):
     """
-    Analyze trends over time
+    Analyze trends over time.
+    If daily trend data aggregated in the database is given (see
+    database.get_daily_trends_sql), it is used instead of the order rows.
     """
+    if trend_data is not None:
+        return trend_data[['date', 'avg_processing_time', 'order_count']]
+    
     if df.empty:
         return pd.DataFrame()
     
-    # Ensure order_date is datetime
-    if df['order_date'].dtype != 'datetime64[ns]':
-        df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-    
-    # Add date features
-    df['date'] = df['order_date'].dt.date
-    df['month'] = df['order_date'].dt.month
-    df['day_of_week'] = df['order_date'].dt.dayofweek
-    
-    # Ensure processing_time is numeric
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
+    df = prepare_frame(df)
     
     # Analyze trends by date
     trend_analysis = df.groupby('date').agg({
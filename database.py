@@ -1,39 +1,79 @@
+import datetime
+import io
 import os
-import psycopg2
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 
+from db_pool import PoolTimeout, get_pool, get_pool_stats
+from query_cache import concat_frames, make_key, query_cache, range_cache
+
+# Seconds between background refreshes of the daily rollup
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "60"))
+
+# Seconds between background order partition maintenance runs
+# (see setup_database.maintain_order_partitions)
+PARTITION_MAINTENANCE_INTERVAL = float(
+    os.getenv("ORDERS_PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+# Seconds between refreshes of the warehouse KPI materialized view
+KPI_VIEW_REFRESH_INTERVAL = float(os.getenv("WAREHOUSE_KPI_VIEW_REFRESH_INTERVAL", "300"))
+
+# How get_warehouse_data reads rows: "read_sql" (pandas.read_sql over a
+# regular cursor) or "copy" (COPY ... TO STDOUT parsed by pandas.read_csv)
+WAREHOUSE_DATA_READER = os.getenv("WAREHOUSE_DATA_READER", "read_sql")
+
+# Number of concurrent queries get_warehouse_data splits a fetch into
+# (1 disables sharding; each shard holds a pooled connection, and at most
+# half of DB_POOL_MAX are used for shards)
+WAREHOUSE_DATA_SHARDS = int(os.getenv("WAREHOUSE_DATA_SHARDS", "1"))
+
+# How fetches are sharded: "date" (contiguous date sub-ranges) or
+# "warehouse" (each shard reads its own set of warehouses)
+WAREHOUSE_DATA_SHARD_BY = os.getenv("WAREHOUSE_DATA_SHARD_BY", "date")
+
+# Rows fetched per round trip, and per chunk, by iter_query_chunks
+QUERY_CHUNK_SIZE = int(os.getenv("QUERY_CHUNK_SIZE", "50000"))
+
+_maintenance_lock = threading.Lock()
+_maintenance_thread = None
+
+_kpi_refresher_lock = threading.Lock()
+_kpi_refresher = None
+_kpi_view_ready = threading.Event()
+
 def get_db_connection():
     """
-    Create a connection to the PostgreSQL database using environment variables
+    Check out a connection to the PostgreSQL database from the shared pool.
+    Returns None if the database can't be reached. Raises db_pool.PoolTimeout
+    if every pooled connection stays busy, so a busy database isn't mistaken
+    for one that is down.
     """
     try:
-        # Try using the complete DATABASE_URL if available
-        database_url = os.getenv("DATABASE_URL")
-        if database_url:
-            # Modify the connection parameters to ensure proper connection
-            conn = psycopg2.connect(
-                database_url,
-                # Set a timeout to avoid long connection attempts
-                connect_timeout=3
-            )
-            return conn
-        
-        # Otherwise use individual connection parameters with explicit host
-        conn = psycopg2.connect(
-            host=os.getenv("PGHOST", "127.0.0.1"),  # Use IP directly instead of 'localhost'
-            database=os.getenv("PGDATABASE", "postgres"),
-            user=os.getenv("PGUSER", "postgres"),
-            password=os.getenv("PGPASSWORD", ""),
-            port=os.getenv("PGPORT", "5432"),
-            # Set a timeout to avoid long connection attempts
-            connect_timeout=3
-        )
-        return conn
+        return get_pool().getconn()
+    except PoolTimeout:
+        raise
     except Exception as e:
         # Don't raise the exception, this will be handled by the caller
         st.error(f"Database connection error: {e}")
         return None
 
+def release_db_connection(conn, close=False):
+    """
+    Return a connection obtained from get_db_connection to the shared pool
+    """
+    get_pool().putconn(conn, close=close)
+
+def get_connection_pool_stats():
+    """
+    Return connection pool counters for monitoring
+    """
+    return get_pool_stats()
+
 def execute_query(query, params=None):
     """
     Execute a query and return the results as a pandas DataFrame
@@ -54,33 +94,435 @@ def execute_query(query, params=None):
         st.error(f"Query execution error: {e}")
         return None
     finally:
-        if conn is not None:
-            conn.close()
+        release_db_connection(conn)
+
+def copy_query(query, params=None, dtype=None, parse_dates=None):
+    """
+    Execute a query with COPY (...) TO STDOUT and parse the CSV output with
+    the pandas C reader, skipping psycopg2's per-value conversion to Python
+    objects. Pass explicit dtypes and date columns to avoid type inference.
+    Returns None if the query fails, like execute_query.
+    """
+    import pandas as pd
+    
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        select = cursor.mogrify(query, params)
+        buffer = io.BytesIO()
+        cursor.copy_expert(b"COPY (" + select + b") TO STDOUT WITH (FORMAT csv, HEADER true)",
+                           buffer)
+        buffer.seek(0)
+        return pd.read_csv(buffer, dtype=dtype, parse_dates=parse_dates,
+                           date_format='%Y-%m-%d' if parse_dates else None,
+                           true_values=['t'], false_values=['f'])
+    except Exception as e:
+        st.error(f"Query execution error: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+def iter_query_chunks(query, params=None, itersize=None):
+    """
+    Execute a query on a named (server-side) cursor and yield the results as
+    DataFrames of at most itersize rows (QUERY_CHUNK_SIZE by default), so
+    only one chunk is held client-side at a time however large the result.
+    Unlike execute_query, errors are raised rather than returned as None,
+    since a partial result would silently skew anything aggregated from it.
+    """
+    import pandas as pd
+    
+    itersize = itersize or QUERY_CHUNK_SIZE
+    conn = get_pool().getconn()
+    close = False
+    try:
+        cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            columns = [column[0] for column in cursor.description]
+            yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    finally:
+        try:
+            # Ending the transaction also closes the server-side cursor
+            conn.rollback()
+        except Exception:
+            close = True
+        release_db_connection(conn, close=close)
+
+def cached_query(query, params=None):
+    """
+    Execute a query through the process-wide result cache, so identical
+    queries from different sessions hit the database once per TTL.
+    Failed queries (None) are not cached.
+    """
+    return query_cache.get_or_load(make_key(query, params),
+                                   lambda: execute_query(query, params=params))
+
+def get_query_cache_stats():
+    """
+    Return query result and date-range cache counters for monitoring
+    """
+    return {'results': query_cache.stats(), 'ranges': range_cache.stats()}
+
+def explain_query(query, params=None, analyze=False):
+    """
+    Return the PostgreSQL query plan as a list of lines, e.g. to check that a
+    dashboard query uses an index scan. Returns None if the query fails.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        cursor.execute(prefix + query, params)
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        st.error(f"Query execution error: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+
+# SQL expression of each column get_warehouse_data can select, in order.
+# The warehouse and product ids come from orders so those joins can be
+# skipped when no other warehouse or product column is selected.
+WAREHOUSE_DATA_COLUMNS = {
+    'warehouse_id': 'o.warehouse_id',
+    'warehouse_name': 'w.warehouse_name',
+    'warehouse_location': 'w.warehouse_location',
+    'team_assignment': 'w.team_assignment',
+    'order_id': 'o.order_id',
+    'product_id': 'o.product_id',
+    'quantity': 'o.quantity',
+    'order_date': 'o.order_date',
+    'expected_delivery_date': 'o.expected_delivery_date',
+    'actual_delivery_date': 'o.actual_delivery_date',
+    'processing_time': 'o.processing_time',
+    'shipping_time': 'o.shipping_time',
+    'order_status': 'o.order_status',
+    'is_fulfilled': 'o.is_fulfilled',
+    'product_name': 'p.product_name',
+    'product_category': 'p.product_category',
+    'brand': 'p.brand',
+}
+
+def warehouse_data_columns(columns=None):
+    """
+    Return the WAREHOUSE_DATA_COLUMNS to select for the requested columns
+    (all of them by default), in query order. order_date is always selected
+    since cached results are split by day.
+    """
+    if columns is None:
+        return list(WAREHOUSE_DATA_COLUMNS)
+    
+    unknown = set(columns) - set(WAREHOUSE_DATA_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown warehouse data columns: {sorted(unknown)}")
+    return [col for col in WAREHOUSE_DATA_COLUMNS if col in columns or col == 'order_date']
+
+def build_warehouse_data_query(columns=None, team_preset=None, warehouse_ids=None):
+    """
+    Build the query for order rows in a date range, selecting only the
+    requested columns and, if a team preset is given, only that team's rows
+    (see utils.team_filter_sql). Warehouses and products are joined only
+    when one of their columns is selected or filtered on. warehouse_ids
+    limits the rows to those warehouses.
+    Returns the query and the parameters that follow the start and end
+    date parameters.
+    """
+    from utils import team_filter_sql
+    
+    team_clause, team_params = team_filter_sql(team_preset)
+    expressions = [WAREHOUSE_DATA_COLUMNS[col] for col in warehouse_data_columns(columns)]
+    referenced = expressions + [team_clause]
+    joins = ""
+    conditions = ["o.order_date BETWEEN %s AND %s"]
+    
+    if any(re.search(r"\bw\.", expr) for expr in referenced):
+        joins += """
+    JOIN 
+        warehouses w ON o.warehouse_id = w.warehouse_id"""
+    else:
+        # Same rows the inner join would keep
+        conditions.append("o.warehouse_id IS NOT NULL")
+    
+    if any(re.search(r"\bp\.", expr) for expr in referenced):
+        joins += """
+    JOIN 
+        products p ON o.product_id = p.product_id"""
+    else:
+        conditions.append("o.product_id IS NOT NULL")
+    
+    params = []
+    if team_params:
+        conditions.append(team_clause)
+        params.extend(team_params)
+    
+    if warehouse_ids is not None:
+        conditions.append("o.warehouse_id = ANY(%s)")
+        params.append(list(warehouse_ids))
+    
+    select_list = ",\n        ".join(expressions)
+    where_clause = "\n        AND ".join(conditions)
+    query = f"""
+    SELECT 
+        {select_list}
+    FROM 
+        orders o{joins}
+    WHERE 
+        {where_clause}
+    """
+    return query, params
+
+# Column types of the build_warehouse_data_query columns for the COPY reader
+WAREHOUSE_DATA_DTYPES = {
+    'warehouse_id': 'int64',
+    'warehouse_name': 'category',
+    'warehouse_location': 'category',
+    'team_assignment': 'category',
+    'order_id': 'int64',
+    'product_id': 'int64',
+    'quantity': 'int64',
+    'processing_time': 'float64',
+    'shipping_time': 'float64',
+    'order_status': 'category',
+    'is_fulfilled': 'bool',
+    'product_name': 'str',
+    'product_category': 'category',
+    'brand': 'category',
+}
+WAREHOUSE_DATA_DATES = ['order_date', 'expected_delivery_date', 'actual_delivery_date']
+
+def read_warehouse_rows(start_date, end_date, reader=None, columns=None, team_preset=None,
+                        warehouse_ids=None):
+    """
+    Run the warehouse data query for the specified date range, columns,
+    team preset and warehouses (see build_warehouse_data_query) with the given
+    reader ("read_sql" or "copy", WAREHOUSE_DATA_READER by default).
+    Returns None if the query fails.
+    """
+    query, query_params = build_warehouse_data_query(columns, team_preset, warehouse_ids)
+    params = [start_date, end_date] + query_params
+    if (reader or WAREHOUSE_DATA_READER) == "copy":
+        selected = warehouse_data_columns(columns)
+        return copy_query(query, params=params,
+                          dtype={col: dtype for col, dtype in WAREHOUSE_DATA_DTYPES.items()
+                                 if col in selected},
+                          parse_dates=[col for col in WAREHOUSE_DATA_DATES if col in selected])
+    return execute_query(query, params=params)
+
+def split_date_range(start_date, end_date, parts):
+    """
+    Split start_date..end_date (inclusive dates) into at most `parts`
+    contiguous sub-ranges of near-equal length
+    """
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return [(start_date, end_date)]
+    
+    parts = max(1, min(parts, days))
+    ranges = []
+    first_day = start_date
+    for index in range(parts):
+        length = days // parts + (1 if index < days % parts else 0)
+        last_day = first_day + datetime.timedelta(days=length - 1)
+        ranges.append((first_day, last_day))
+        first_day = last_day + datetime.timedelta(days=1)
+    return ranges
+
+def read_warehouse_rows_sharded(start_date, end_date, columns=None, team_preset=None,
+                                shards=None, shard_by=None):
+    """
+    Run the warehouse data query as `shards` (WAREHOUSE_DATA_SHARDS)
+    concurrent queries over pooled connections, split by date sub-range or
+    by warehouse (WAREHOUSE_DATA_SHARD_BY), and concatenate the results, so
+    a wide range is fetched by several database backends at once.
+    Returns None if any shard fails. The shard count is capped at half the
+    pool's maxconn so other sessions' queries still get connections; if the
+    pool runs dry anyway, the range is read again as a single query.
+    """
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    
+    shards = max(1, min(shards or WAREHOUSE_DATA_SHARDS, get_pool().maxconn // 2))
+    if (shard_by or WAREHOUSE_DATA_SHARD_BY) == "warehouse":
+        warehouses = cached_query("SELECT warehouse_id FROM warehouses ORDER BY warehouse_id")
+        if warehouses is None:
+            return None
+        # Deal the warehouses out so each shard reads its own warehouses'
+        # rows through the (warehouse_id, order_date) index
+        warehouse_ids = warehouses['warehouse_id'].tolist()
+        tasks = [(start_date, end_date, warehouse_ids[index::shards])
+                 for index in range(min(shards, len(warehouse_ids)))]
+        if not tasks:
+            tasks = [(start_date, end_date, None)]
+    else:
+        tasks = [(first_day, last_day, None)
+                 for first_day, last_day in split_date_range(start_date, end_date, shards)]
+    
+    def read_shard(task):
+        first_day, last_day, warehouse_ids = task
+        return read_warehouse_rows(first_day, last_day, columns=columns,
+                                   team_preset=team_preset, warehouse_ids=warehouse_ids)
+    
+    if len(tasks) == 1:
+        return read_shard(tasks[0])
+    
+    # Query errors are reported with st.error, which needs the session's
+    # script context in the worker threads
+    ctx = get_script_run_ctx(suppress_warning=True)
+    try:
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warehouse-shard",
+                                initializer=lambda: add_script_run_ctx(threading.current_thread(),
+                                                                       ctx)
+                                ) as executor:
+            frames = list(executor.map(read_shard, tasks))
+    except PoolTimeout:
+        # Other sessions hold the rest of the pool; one connection at a
+        # time is still better than none
+        print("Connection pool exhausted by warehouse data shards; reading unsharded")
+        return read_shard((start_date, end_date, None))
+    
+    if any(frame is None for frame in frames):
+        return None
+    return concat_frames([frame for frame in frames if len(frame)] or frames[:1])
+
+def compare_warehouse_data_readers(start_date, end_date, repeat=3):
+    """
+    Time both readers on the specified date range against the live database,
+    bypassing the caches. Returns the best time in seconds and the row count
+    per reader, e.g. to decide on WAREHOUSE_DATA_READER.
+    """
+    timings = {}
+    for reader in ("read_sql", "copy"):
+        best = None
+        rows = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            df = read_warehouse_rows(start_date, end_date, reader=reader)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            rows = None if df is None else len(df)
+        timings[reader] = {'seconds': best, 'rows': rows}
+    return timings
 
-def get_warehouse_data(start_date, end_date):
+def get_warehouse_data(start_date, end_date, columns=None, team_preset=None):
     """
     Get warehouse data for the specified date range
     If database connection fails, returns None so caller can use sample data
+    Only the given columns (plus order_date) are fetched, if any are given.
+    If a team preset is given only that team's rows are returned, filtered
+    in the database (or in pandas for the sample data); attrs['team_preset']
+    records which preset the rows are filtered by. A preset that can't be
+    filtered in SQL leaves the rows unfiltered, with the preset's columns
+    selected so the caller can filter them in pandas.
+    Raises db_pool.PoolTimeout, rather than returning sample data, if no
+    pooled connection frees up in time.
+    """
+    from utils import get_team_filters, team_filter_sql
+    
+    sql_preset = team_preset
+    try:
+        team_filter_sql(team_preset)
+    except KeyError:
+        # The preset matches on a column SQL can't filter on
+        if columns is not None:
+            columns = list(columns) + list(get_team_filters()[team_preset])
+        sql_preset = None
+    
+    query, team_params = build_warehouse_data_query(columns, sql_preset)
+    
+    # Only the days not already cached are queried; string columns are
+    # encoded as categoricals before they are cached
+    from data_processor import encode_categoricals
+    result = range_cache.get_range(
+        make_key(query, [WAREHOUSE_DATA_READER] + team_params),
+        start_date, end_date,
+        lambda first_day, last_day: encode_categoricals(
+            read_warehouse_rows_sharded(first_day, last_day, columns=columns,
+                                team_preset=sql_preset))
+    )
+    
+    # If database query failed, we'll return None and the app will use sample data
+    if result is None:
+        st.warning("Database connection failed. Using sample data instead.")
+        from sample_data import get_sample_data
+        from utils import filter_data_by_team
+        sample = get_sample_data()
+        if team_preset is not None:
+            sample = filter_data_by_team(sample, team_preset)
+        # Let callers know not to run further database queries for this frame
+        sample.attrs['source'] = 'sample'
+        sample.attrs['team_preset'] = team_preset
+        return sample
+    
+    result.attrs['team_preset'] = sql_preset
+    return result
+
+def iter_warehouse_data(start_date, end_date, itersize=None, team_preset=None):
+    """
+    Stream the rows of get_warehouse_data for the specified date range (and
+    team preset) in chunks (see iter_query_chunks), bypassing the result
+    caches; e.g. data_processor.fold_kpis(iter_warehouse_data(start, end),
+    by=WAREHOUSE_KEYS) computes multi-year KPIs in bounded memory
+    """
+    from data_processor import encode_categoricals
+    from utils import filter_data_by_team, team_filter_sql
+    
+    sql_preset = team_preset
+    try:
+        team_filter_sql(team_preset)
+    except KeyError:
+        # The preset matches on a column SQL can't filter on; filter each
+        # chunk in pandas instead
+        sql_preset = None
+    
+    query, team_params = build_warehouse_data_query(team_preset=sql_preset)
+    for chunk in iter_query_chunks(query, params=[start_date, end_date] + team_params,
+                                   itersize=itersize):
+        chunk = encode_categoricals(chunk)
+        if sql_preset != team_preset:
+            chunk = filter_data_by_team(chunk, team_preset)
+        yield chunk
+
+def get_warehouse_performance_sql(start_date, end_date, team_preset="All Teams"):
+    """
+    Compute per-warehouse performance metrics in the database for the
+    specified date range and team preset, returning one row per warehouse.
+    Produces the same columns as data_processor.get_warehouse_performance.
+    Returns None if the query fails, or the team preset can't be filtered in
+    SQL, so the caller can fall back to pandas.
     """
-    query = """
+    from data_processor import add_performance_score
+    from utils import team_filter_sql
+    
+    # Read the materialized KPI view once the refresher has it in place
+    if _kpi_view_ready.is_set():
+        result = get_warehouse_performance_kpi_view(start_date, end_date, team_preset)
+        if result is not None:
+            return result
+    
+    try:
+        team_clause, team_params = team_filter_sql(team_preset)
+    except KeyError:
+        # The preset matches on a column SQL can't filter on
+        return None
+    query = f"""
     SELECT 
         w.warehouse_id, 
         w.warehouse_name, 
         w.warehouse_location,
-        w.team_assignment,
-        o.order_id,
-        o.product_id,
-        o.quantity,
-        o.order_date,
-        o.expected_delivery_date,
-        o.actual_delivery_date,
-        o.processing_time,
-        o.shipping_time,
-        o.order_status,
-        o.is_fulfilled,
-        p.product_name,
-        p.product_category,
-        p.brand
+        AVG(o.processing_time)::float8 AS avg_processing_time,
+        AVG(COALESCE(o.actual_delivery_date > o.expected_delivery_date, FALSE)::int)::float8 * 100 AS delay_rate,
+        AVG(o.is_fulfilled::int)::float8 * 100 AS fulfillment_rate,
+        COUNT(o.order_id) AS order_count
     FROM 
         warehouses w
     JOIN 
@@ -89,14 +531,262 @@ def get_warehouse_data(start_date, end_date):
         products p ON o.product_id = p.product_id
     WHERE 
         o.order_date BETWEEN %s AND %s
+        AND {team_clause}
+    GROUP BY 
+        w.warehouse_id, w.warehouse_name, w.warehouse_location
+    ORDER BY 
+        w.warehouse_id, w.warehouse_name, w.warehouse_location
     """
     
-    result = execute_query(query, params=[start_date, end_date])
+    result = cached_query(query, params=[start_date, end_date] + team_params)
+    if result is None:
+        return None
+    
+    return add_performance_score(result)
+
+def get_warehouse_performance_kpi_view(start_date, end_date, team_preset="All Teams"):
+    """
+    Compute per-warehouse performance metrics from the warehouse_daily_kpis
+    materialized view, with the time of its last refresh in
+    result.attrs['refreshed_at']. Returns None if the view can't answer
+    the query.
+    """
+    from data_processor import add_performance_score
+    from utils import team_filter_sql
     
-    # If database query failed, we'll return None and the app will use sample data
+    try:
+        team_clause, team_params = team_filter_sql(team_preset, columns={
+            'warehouse_name': 'w.warehouse_name',
+            'warehouse_location': 'w.warehouse_location',
+            'team_assignment': 'w.team_assignment',
+            'product_category': 'k.product_category'
+        })
+    except KeyError:
+        # The preset matches on a column the view doesn't carry
+        return None
+    
+    query = f"""
+    SELECT 
+        w.warehouse_id, 
+        w.warehouse_name, 
+        w.warehouse_location,
+        (SUM(k.sum_processing_time) / SUM(k.order_count))::float8 AS avg_processing_time,
+        (100.0 * SUM(k.delayed_count) / SUM(k.order_count))::float8 AS delay_rate,
+        (100.0 * SUM(k.fulfilled_count) / SUM(k.order_count))::float8 AS fulfillment_rate,
+        SUM(k.order_count)::int8 AS order_count,
+        (SELECT refreshed_at FROM warehouse_kpi_view_refresh) AS refreshed_at
+    FROM 
+        warehouse_daily_kpis k
+    JOIN 
+        warehouses w ON k.warehouse_id = w.warehouse_id
+    WHERE 
+        k.order_date BETWEEN %s AND %s
+        AND {team_clause}
+    GROUP BY 
+        w.warehouse_id, w.warehouse_name, w.warehouse_location
+    ORDER BY 
+        w.warehouse_id, w.warehouse_name, w.warehouse_location
+    """
+    
+    result = cached_query(query, params=[start_date, end_date] + team_params)
     if result is None:
-        st.warning("Database connection failed. Using sample data instead.")
-        from sample_data import get_sample_data
-        return get_sample_data()
+        return None
+    
+    refreshed_at = result['refreshed_at'].iloc[0] if len(result) else None
+    result = add_performance_score(result.drop(columns='refreshed_at'))
+    result.attrs['refreshed_at'] = refreshed_at
+    return result
+
+def start_warehouse_kpi_refresher():
+    """
+    Start the background thread that refreshes the warehouse KPI
+    materialized view every KPI_VIEW_REFRESH_INTERVAL seconds, once per
+    process. Does nothing unless WAREHOUSE_KPI_VIEW is enabled.
+    """
+    global _kpi_refresher
+    from setup_database import warehouse_kpi_view_enabled
+    
+    if not warehouse_kpi_view_enabled():
+        return False
+    
+    with _kpi_refresher_lock:
+        if _kpi_refresher is None:
+            _kpi_refresher = threading.Thread(target=_refresh_warehouse_kpi_view_loop,
+                                              name="warehouse-kpi-refresher", daemon=True)
+            _kpi_refresher.start()
+    return True
+
+def _refresh_warehouse_kpi_view_loop():
+    from setup_database import refresh_warehouse_kpi_view
+    
+    while True:
+        conn = None
+        try:
+            # Not get_db_connection: st.error can't be shown from this thread
+            conn = get_pool().getconn()
+            refreshed = refresh_warehouse_kpi_view(conn)
+            conn.commit()
+            release_db_connection(conn)
+            if refreshed:
+                _kpi_view_ready.set()
+        except Exception as e:
+            print(f"Error refreshing warehouse KPI view: {e}")
+            if conn is not None:
+                release_db_connection(conn, close=True)
+        time.sleep(KPI_VIEW_REFRESH_INTERVAL)
+
+def stage_case_sql(stages, column="o.processing_time"):
+    """
+    Build a SQL CASE expression mapping a processing time to its stage index
+    in a data_processor stage table (NULL outside the stage edges), with the
+    bin edges as parameters
+    """
+    lower_op, upper_op = (">", "<=") if stages['closed'] == 'right' else (">=", "<")
+    clauses = []
+    params = []
+    edges = stages['edges']
+    for index in range(len(stages['labels'])):
+        clauses.append(f"WHEN {column} {lower_op} %s AND {column} {upper_op} %s THEN {index}")
+        params.extend([edges[index], edges[index + 1]])
+    return "CASE " + " ".join(clauses) + " END", params
+
+def get_stage_histogram_sql(start_date, end_date, team_preset="All Teams", stages=None):
+    """
+    Count orders and total processing time per warehouse and processing
+    stage in the database for the specified date range and team preset.
+    Returns columns warehouse_id, warehouse_name, stage (index into
+    stages['labels'], with the stage table in attrs['stages']), order_count
+    and total_time, or None if the query fails or the team preset can't be
+    filtered in SQL.
+    """
+    from data_processor import PROCESS_STAGES
+    from utils import team_filter_sql
+    
+    stages = stages or PROCESS_STAGES
+    stage_case, stage_params = stage_case_sql(stages)
+    try:
+        team_clause, team_params = team_filter_sql(team_preset)
+    except KeyError:
+        # The preset matches on a column SQL can't filter on
+        return None
+    query = f"""
+    SELECT 
+        warehouse_id, 
+        warehouse_name, 
+        stage,
+        COUNT(*) AS order_count,
+        SUM(processing_time)::float8 AS total_time
+    FROM (
+        SELECT 
+            w.warehouse_id, 
+            w.warehouse_name, 
+            o.processing_time,
+            {stage_case} AS stage
+        FROM 
+            warehouses w
+        JOIN 
+            orders o ON w.warehouse_id = o.warehouse_id
+        JOIN 
+            products p ON o.product_id = p.product_id
+        WHERE 
+            o.order_date BETWEEN %s AND %s
+            AND {team_clause}
+    ) staged
+    WHERE 
+        stage IS NOT NULL
+    GROUP BY 
+        warehouse_id, warehouse_name, stage
+    ORDER BY 
+        warehouse_id, warehouse_name, stage
+    """
     
+    result = cached_query(query, params=stage_params + [start_date, end_date] + team_params)
+    if result is not None:
+        # Record which stage table the codes index into
+        result.attrs['stages'] = stages
     return result
+
+def start_order_maintenance():
+    """
+    Start the background thread that brings the daily rollup up to date
+    every ROLLUP_REFRESH_INTERVAL seconds and rolls the order partitions
+    forward every PARTITION_MAINTENANCE_INTERVAL seconds, once per process,
+    so neither runs on a dashboard request
+    """
+    global _maintenance_thread
+    
+    with _maintenance_lock:
+        if _maintenance_thread is None:
+            _maintenance_thread = threading.Thread(target=_order_maintenance_loop,
+                                                   name="order-maintenance", daemon=True)
+            _maintenance_thread.start()
+
+def _order_maintenance_loop():
+    from setup_database import maintain_order_partitions, refresh_daily_rollup
+    
+    partitions_maintained_at = None
+    while True:
+        if (partitions_maintained_at is None
+                or time.monotonic() - partitions_maintained_at >= PARTITION_MAINTENANCE_INTERVAL):
+            if _run_maintenance(maintain_order_partitions, "maintaining order partitions"):
+                partitions_maintained_at = time.monotonic()
+        _run_maintenance(refresh_daily_rollup, "refreshing daily rollup")
+        time.sleep(ROLLUP_REFRESH_INTERVAL)
+
+def _run_maintenance(task, description):
+    conn = None
+    try:
+        # Not get_db_connection: st.error can't be shown from this thread
+        conn = get_pool().getconn()
+        task(conn)
+        conn.commit()
+        release_db_connection(conn)
+        return True
+    except Exception as e:
+        print(f"Error {description}: {e}")
+        if conn is not None:
+            release_db_connection(conn, close=True)
+        return False
+
+def get_daily_trends_sql(start_date, end_date, team_preset="All Teams"):
+    """
+    Get daily order counts and processing metrics for the specified date
+    range and team preset from the daily rollup, so long ranges read one row
+    per day, warehouse and category instead of every order. The rollup is
+    kept up to date by start_order_maintenance.
+    Returns None if the rollup can't answer the query.
+    """
+    from utils import team_filter_sql
+    
+    try:
+        team_clause, team_params = team_filter_sql(team_preset, columns={
+            'warehouse_name': 'w.warehouse_name',
+            'warehouse_location': 'w.warehouse_location',
+            'team_assignment': 'w.team_assignment',
+            'product_category': 'r.product_category'
+        })
+    except KeyError:
+        # The preset matches on a column the rollup doesn't carry
+        return None
+    
+    query = f"""
+    SELECT 
+        r.order_date AS date,
+        (SUM(r.sum_processing_time) / SUM(r.order_count))::float8 AS avg_processing_time,
+        SUM(r.order_count)::int8 AS order_count,
+        (100.0 * SUM(r.delayed_count) / SUM(r.order_count))::float8 AS delay_rate,
+        (100.0 * SUM(r.fulfilled_count) / SUM(r.order_count))::float8 AS fulfillment_rate
+    FROM 
+        orders_daily_rollup r
+    JOIN 
+        warehouses w ON r.warehouse_id = w.warehouse_id
+    WHERE 
+        r.order_date BETWEEN %s AND %s
+        AND {team_clause}
+    GROUP BY 
+        r.order_date
+    ORDER BY 
+        r.order_date
+    """
+    
+    return cached_query(query, params=[start_date, end_date] + team_params)
@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+def create_connection():
+    """
+    Open a new connection to the PostgreSQL database using environment variables
+    """
+    # Try using the complete DATABASE_URL if available
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        return psycopg2.connect(
+            database_url,
+            # Set a timeout to avoid long connection attempts
+            connect_timeout=3
+        )
+    
+    # Otherwise use individual connection parameters with explicit host
+    return psycopg2.connect(
+        host=os.getenv("PGHOST", "127.0.0.1"),  # Use IP directly instead of 'localhost'
+        database=os.getenv("PGDATABASE", "postgres"),
+        user=os.getenv("PGUSER", "postgres"),
+        password=os.getenv("PGPASSWORD", ""),
+        port=os.getenv("PGPORT", "5432"),
+        # Set a timeout to avoid long connection attempts
+        connect_timeout=3
+    )
+
+class PoolTimeout(pool.PoolError):
+    """
+    Raised when no pooled connection frees up within the checkout timeout:
+    the database is reachable but every connection is busy
+    """
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections shared by the whole process.
+    
+    Connections are opened lazily up to ``maxconn``. Idle connections beyond
+    ``minconn`` are closed once they have been unused for ``idle_timeout``
+    seconds, and a connection that has been idle for longer than
+    ``health_check_interval`` seconds is probed with ``SELECT 1`` before it is
+    handed out again.
+    """
+    
+    def __init__(self, connect=create_connection, minconn=1, maxconn=10,
+                 idle_timeout=300, health_check_interval=30, checkout_timeout=10):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: minconn=%s, maxconn=%s" % (minconn, maxconn))
+        
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recent on the right
+        self._in_use = set()
+        self._opening = 0
+        self._closed = False
+        
+        self._stats = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'reused': 0,
+            'health_check_failures': 0,
+            'idle_evictions': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+    
+    def getconn(self):
+        """
+        Check out a connection, reusing an idle one when possible.
+        Raises PoolTimeout if the pool stays exhausted for checkout_timeout seconds.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn, last_used = self._reserve(deadline)
+            if conn is None:
+                break
+            
+            if self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._stats['checkouts'] += 1
+                    self._stats['reused'] += 1
+                return conn
+            
+            # The idle connection went bad; drop it and try the next one
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+                self._in_use.discard(id(conn))
+                self._cond.notify()
+            self._close(conn)
+        
+        # No idle connection was available but a slot was reserved for a new one
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        
+        with self._cond:
+            self._opening -= 1
+            self._in_use.add(id(conn))
+            self._stats['connections_created'] += 1
+            self._stats['checkouts'] += 1
+        return conn
+    
+    def putconn(self, conn, close=False):
+        """
+        Return a connection to the pool, closing it if it is broken or ``close`` is set
+        """
+        if conn is None:
+            return
+        
+        if not close and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+        else:
+            close = True
+        
+        with self._cond:
+            self._in_use.discard(id(conn))
+            if not close and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        
+        if conn is not None:
+            self._close(conn)
+    
+    def closeall(self):
+        """
+        Close every idle connection and refuse further checkouts
+        """
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+    
+    def stats(self):
+        """
+        Return a snapshot of pool counters for monitoring
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'minconn': self.minconn,
+                'maxconn': self.maxconn,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'size': len(self._idle) + len(self._in_use) + self._opening,
+            })
+        return stats
+    
+    def _reserve(self, deadline):
+        """
+        Pop an idle connection, or reserve a slot for a new one (returns (None, None))
+        """
+        evicted = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise pool.PoolError("connection pool is closed")
+                    
+                    evicted.extend(self._evict_idle())
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        self._in_use.add(id(conn))
+                        break
+                    
+                    if len(self._in_use) + self._opening < self.maxconn:
+                        self._opening += 1
+                        conn, last_used = None, None
+                        break
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout("timed out waiting for a database connection")
+                    self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+        finally:
+            for stale in evicted:
+                self._close(stale)
+        return conn, last_used
+    
+    def _evict_idle(self):
+        """
+        Remove connections idle for longer than idle_timeout, keeping at least minconn
+        """
+        evicted = []
+        now = time.monotonic()
+        # The oldest connections sit on the left of the deque
+        while (self._idle and
+               len(self._idle) + len(self._in_use) + self._opening > self.minconn and
+               now - self._idle[0][1] > self.idle_timeout):
+            evicted.append(self._idle.popleft()[0])
+            self._stats['idle_evictions'] += 1
+        return evicted
+    
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+    
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['connections_closed'] += 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv("DB_POOL_MIN", "1")),
+                    maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+                    idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+                    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+                    checkout_timeout=float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "10")),
+                )
+    return _pool
+
+def get_pool_stats():
+    """
+    Return monitoring counters for the process-wide pool
+    """
+    return get_pool().stats()
@@ -0,0 +1,298 @@
+import datetime
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+def normalize_param(value):
+    """
+    Normalize a query parameter for use in a cache key, so equivalent date
+    ranges (e.g. a date and a midnight datetime) share an entry
+    """
+    if hasattr(value, 'to_pydatetime'):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time(0) and value.tzinfo is None:
+            return value.date()
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_param(v) for v in value)
+    return value
+
+def make_key(query, params=None):
+    """
+    Build a cache key from the query text (whitespace-insensitive) and its parameters
+    """
+    normalized_query = re.sub(r"\s+", " ", query).strip()
+    return normalized_query, normalize_param(params or ())
+
+def frame_nbytes(df):
+    """
+    Approximate memory footprint of a DataFrame in bytes
+    """
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query result DataFrames shared by every session
+    in the process. Entries expire after ``ttl`` seconds and the least
+    recently used entries are evicted to keep the total under ``max_bytes``.
+    """
+    
+    def __init__(self, ttl=300, max_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (frame, nbytes, stored_at)
+        self._loading = {}  # key -> lock held while the result is being fetched
+        self._nbytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+    
+    def get(self, key):
+        """
+        Return a shallow copy of the cached frame for key, or None
+        """
+        with self._lock:
+            df = self._lookup(key)
+            self._stats['hits' if df is not None else 'misses'] += 1
+            return df
+    
+    def put(self, key, df):
+        """
+        Store a frame, evicting least recently used entries to stay under max_bytes
+        """
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                # Never cache a result larger than the whole budget
+                return
+            while self._entries and self._nbytes + nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+            self._entries[key] = (df, nbytes, time.monotonic())
+            self._nbytes += nbytes
+    
+    def get_or_load(self, key, loader):
+        """
+        Return the cached frame for key, calling loader() on a miss. Concurrent
+        misses for the same key wait for a single load. Results of None are
+        not cached.
+        """
+        with self._lock:
+            df = self._lookup(key)
+            if df is not None:
+                self._stats['hits'] += 1
+                return df
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            # Another session may have loaded it while we waited
+            with self._lock:
+                df = self._lookup(key)
+                self._stats['hits' if df is not None else 'misses'] += 1
+            if df is not None:
+                return df
+            
+            try:
+                df = loader()
+                if df is not None:
+                    self.put(key, df)
+                    df = df.copy(deep=False)
+                return df
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+    
+    def stats(self):
+        """
+        Return hit/miss counters and current size for monitoring
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._nbytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            })
+        return stats
+    
+    def _lookup(self, key):
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl:
+            self._remove(key)
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0].copy(deep=False)
+    
+    def _remove(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._nbytes -= nbytes
+
+def contiguous_runs(days):
+    """
+    Group a sorted list of dates into (first, last) pairs of consecutive days
+    """
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == datetime.timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+def split_by_day(df, date_column, start_date, end_date):
+    """
+    Split a frame into one frame per day from start_date to end_date
+    (inclusive); days without rows get an empty frame with the same columns.
+    The rows are sorted by day once and sliced per day, rather than scanned
+    once per day.
+    """
+    day_values = pd.to_datetime(df[date_column]).to_numpy().astype('datetime64[D]')
+    has_day = ~np.isnat(day_values)
+    if not has_day.all():
+        df, day_values = df[has_day], day_values[has_day]
+    
+    buckets = {}
+    if len(df):
+        day_numbers = day_values.astype(np.int64)
+        first_day = day_numbers.min()
+        offsets = day_numbers - first_day
+        # A stable sort of small integers is a radix sort in NumPy
+        if offsets.max() < np.iinfo(np.int16).max:
+            offsets = offsets.astype(np.int16)
+        order = np.argsort(offsets, kind='stable')
+        counts = np.bincount(offsets)
+        ends = np.cumsum(counts)
+        by_day = df.take(order)
+        
+        for offset in np.flatnonzero(counts):
+            day = (np.datetime64(0, 'D') + int(first_day + offset)).item()
+            # Copy each slice so a bucket doesn't keep the whole sorted frame alive
+            buckets[day] = (by_day.iloc[ends[offset] - counts[offset]:ends[offset]]
+                            .reset_index(drop=True).copy())
+    
+    empty = df.iloc[:0]
+    day = start_date
+    while day <= end_date:
+        buckets.setdefault(day, empty)
+        day += datetime.timedelta(days=1)
+    return buckets
+
+def concat_frames(frames):
+    """
+    Concatenate frames, keeping categorical columns categorical even when the
+    frames were encoded with different (e.g. since-extended) category sets
+    """
+    frames = list(frames)
+    for col in frames[0].columns:
+        dtypes = [frame[col].dtype for frame in frames]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            continue
+        # Union of the categories in order of first appearance
+        categories = pd.Index(pd.unique(np.concatenate([dtype.categories.to_numpy(dtype=object)
+                                                        for dtype in dtypes])))
+        frames = [frame.assign(**{col: frame[col].cat.set_categories(categories)})
+                  for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+class DateRangeCache(QueryCache):
+    """
+    Cache of date-range query results stored as one bucket per day. A request
+    only queries the days that are not cached yet (as contiguous sub-ranges)
+    and stitches cached and new buckets together, so widening or sliding a
+    date window costs proportional to the new days only. Buckets share the
+    TTL and byte-bounded LRU eviction of QueryCache.
+    """
+    
+    def __init__(self, ttl=300, max_bytes=512 * 1024 * 1024):
+        super().__init__(ttl=ttl, max_bytes=max_bytes)
+        self._stats['range_fetches'] = 0
+    
+    def get_range(self, key, start_date, end_date, fetch, date_column='order_date'):
+        """
+        Return rows for start_date..end_date (inclusive dates) for the query
+        identified by key. fetch(first_day, last_day) is called for each
+        missing sub-range and must return a frame with date_column, or None
+        on failure (in which case None is returned and nothing is cached).
+        """
+        start_date = normalize_param(start_date)
+        end_date = normalize_param(end_date)
+        if isinstance(start_date, datetime.datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime.datetime):
+            end_date = end_date.date()
+        if end_date < start_date:
+            return fetch(start_date, end_date)
+        
+        days = [start_date + datetime.timedelta(days=i)
+                for i in range((end_date - start_date).days + 1)]
+        
+        # Serialize fills of the same query so concurrent sessions don't
+        # fetch the same missing days twice
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        
+        try:
+            with key_lock:
+                frames = {}
+                missing = []
+                with self._lock:
+                    for day in days:
+                        df = self._lookup((key, day))
+                        if df is None:
+                            missing.append(day)
+                            self._stats['misses'] += 1
+                        else:
+                            frames[day] = df
+                            self._stats['hits'] += 1
+                
+                for first_day, last_day in contiguous_runs(missing):
+                    fetched = fetch(first_day, last_day)
+                    if fetched is None:
+                        return None
+                    with self._lock:
+                        self._stats['range_fetches'] += 1
+                    for day, bucket in split_by_day(fetched, date_column, first_day, last_day).items():
+                        self.put((key, day), bucket)
+                        frames[day] = bucket
+        finally:
+            with self._lock:
+                # Drop the fill lock once done so _loading doesn't grow with
+                # every distinct query
+                if self._loading.get(key) is key_lock:
+                    del self._loading[key]
+        
+        non_empty = [frames[day] for day in days if len(frames[day])]
+        if not non_empty:
+            return frames[days[0]].copy(deep=False)
+        return concat_frames(non_empty)
+
+# Process-wide cache of dashboard query results
+query_cache = QueryCache(
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+    max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+
+# Process-wide cache of date-range query results, bucketed by day
+range_cache = DateRangeCache(
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+    max_bytes=int(os.getenv("RANGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+)
@@ -1,119 +1,108 @@
+import functools
+import os
 import pandas as pd
 import numpy as np
 import datetime
-import random
 
-def generate_sample_data():
+# Number of distinct sample datasets kept in memory across sessions
+SAMPLE_DATA_CACHE_SIZE = int(os.getenv("SAMPLE_DATA_CACHE_SIZE", "4"))
+
+WAREHOUSE_LOCATIONS = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix',
+                       'Philadelphia', 'San Antonio', 'San Diego', 'Dallas']
+TEAM_ASSIGNMENTS = ['Brand Team', 'Performance Team', 'Social Media Team']
+PRODUCT_CATEGORIES = ['Electronics', 'Clothing', 'Furniture', 'Food', 'Books']
+BRANDS = ['PremiumBrand', 'ValueChoice', 'LuxuryItems', 'EssentialGoods', 'TrendyStuff']
+STATUS_OPTIONS = ['Processing', 'Shipped', 'Delivered', 'Canceled']
+
+def generate_sample_data(num_orders=200, num_warehouses=5, num_products=20, seed=42):
     """
-    Generate sample warehouse, product, and order data for demonstration purposes
+    Generate sample warehouse, product, and order data for demonstration purposes.
+    All columns are drawn as NumPy arrays in one shot, so millions of orders
+    can be generated quickly; name and category columns are categoricals.
     """
-    # Set random seed for reproducible results
-    np.random.seed(42)
-    random.seed(42)
-    
-    # Define constants
-    num_warehouses = 5
-    num_products = 20
-    num_orders = 200
-    
+    # Seeded generator for reproducible results
+    rng = np.random.default_rng(seed)
+
     # Create sample date range (last 60 days)
-    end_date = datetime.datetime.now()
-    start_date = end_date - datetime.timedelta(days=60)
-    
-    # Generate warehouse data
-    warehouses = []
-    warehouse_locations = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 
-                          'Philadelphia', 'San Antonio', 'San Diego', 'Dallas']
-    team_assignments = ['Brand Team', 'Performance Team', 'Social Media Team']
-    
-    for i in range(1, num_warehouses + 1):
-        warehouses.append({
-            'warehouse_id': i,
-            'warehouse_name': f'Warehouse #{i}',
-            'warehouse_location': random.choice(warehouse_locations),
-            'team_assignment': random.choice(team_assignments)
-        })
-    
-    # Generate product data
-    products = []
-    product_categories = ['Electronics', 'Clothing', 'Furniture', 'Food', 'Books']
-    brands = ['PremiumBrand', 'ValueChoice', 'LuxuryItems', 'EssentialGoods', 'TrendyStuff']
-    
-    for i in range(1, num_products + 1):
-        products.append({
-            'product_id': i,
-            'product_name': f'Product {i}',
-            'product_category': random.choice(product_categories),
-            'brand': random.choice(brands)
-        })
-    
-    # Generate order data
-    orders = []
-    status_options = ['Processing', 'Shipped', 'Delivered', 'Canceled']
-    
-    for i in range(1, num_orders + 1):
-        # Random dates within range
-        order_date = start_date + datetime.timedelta(
-            days=random.randint(0, (end_date - start_date).days)
-        )
-        
-        # Random processing time (2-48 hours)
-        processing_time = random.uniform(2, 48)
-        
-        # Random shipping time (1-5 days)
-        shipping_time = random.uniform(24, 120)  # In hours
-        
-        # Expected delivery date
-        expected_delivery = order_date + datetime.timedelta(hours=processing_time + shipping_time)
-        
-        # Actual delivery date (with possible delay)
-        delay = random.choice([0, 0, 0, 0, 12, 24, 48])  # 60% on time, 40% delayed
-        actual_delivery = expected_delivery + datetime.timedelta(hours=delay)
-        
-        # Order status
-        if (datetime.datetime.now() - order_date).days > 7:
-            # Older orders likely delivered
-            status = random.choices(
-                ['Delivered', 'Canceled'], 
-                weights=[0.95, 0.05]
-            )[0]
-        else:
-            # Newer orders might be in process
-            status = random.choice(status_options)
-        
-        # Is order fulfilled
-        is_fulfilled = 1 if status == 'Delivered' else 0
-        
-        orders.append({
-            'order_id': i,
-            'warehouse_id': random.randint(1, num_warehouses),
-            'product_id': random.randint(1, num_products),
-            'quantity': random.randint(1, 5),
-            'order_date': order_date,
-            'expected_delivery_date': expected_delivery,
-            'actual_delivery_date': actual_delivery if status == 'Delivered' else None,
-            'processing_time': processing_time,
-            'shipping_time': shipping_time,
-            'order_status': status,
-            'is_fulfilled': is_fulfilled
-        })
-    
-    # Create DataFrames
-    warehouses_df = pd.DataFrame(warehouses)
-    products_df = pd.DataFrame(products)
-    orders_df = pd.DataFrame(orders)
-    
-    # Join data to create the final dataset
-    merged_df = orders_df.merge(
-        warehouses_df, on='warehouse_id'
-    ).merge(
-        products_df, on='product_id'
-    )
-    
-    return merged_df
+    end_date = pd.Timestamp(datetime.datetime.now())
+    start_date = end_date - pd.Timedelta(days=60)
+    num_days = (end_date - start_date).days
+
+    # Per-warehouse and per-product attributes (indexes into the value lists)
+    warehouse_location_idx = rng.integers(0, len(WAREHOUSE_LOCATIONS), num_warehouses)
+    team_assignment_idx = rng.integers(0, len(TEAM_ASSIGNMENTS), num_warehouses)
+    product_category_idx = rng.integers(0, len(PRODUCT_CATEGORIES), num_products)
+    brand_idx = rng.integers(0, len(BRANDS), num_products)
+
+    # Order attributes
+    warehouse_id = rng.integers(1, num_warehouses + 1, num_orders)
+    product_id = rng.integers(1, num_products + 1, num_orders)
+    quantity = rng.integers(1, 6, num_orders)
+
+    # Random dates within range
+    order_date = start_date + pd.to_timedelta(rng.integers(0, num_days + 1, num_orders), unit='D')
+
+    # Random processing time (2-48 hours) and shipping time (1-5 days, in hours)
+    processing_time = rng.uniform(2, 48, num_orders)
+    shipping_time = rng.uniform(24, 120, num_orders)
+
+    # Expected delivery date
+    expected_delivery = order_date + pd.to_timedelta(processing_time + shipping_time, unit='h')
+
+    # Actual delivery date (with possible delay)
+    delay = rng.choice([0, 0, 0, 0, 12, 24, 48], num_orders)  # 60% on time, 40% delayed
+    actual_delivery = expected_delivery + pd.to_timedelta(delay, unit='h')
+
+    # Order status: older orders likely delivered, newer orders might be in process
+    is_old = (end_date - order_date).days > 7
+    old_status = np.where(rng.random(num_orders) < 0.95, 2, 3)  # Delivered or Canceled
+    new_status = rng.integers(0, len(STATUS_OPTIONS), num_orders)
+    status_idx = np.where(is_old, old_status, new_status)
+
+    # Is order fulfilled
+    delivered = status_idx == STATUS_OPTIONS.index('Delivered')
+
+    # Build the joined frame column-wise
+    warehouse_idx = warehouse_id - 1
+    product_idx = product_id - 1
+    return pd.DataFrame({
+        'order_id': np.arange(1, num_orders + 1),
+        'warehouse_id': warehouse_id,
+        'product_id': product_id,
+        'quantity': quantity,
+        'order_date': order_date,
+        'expected_delivery_date': expected_delivery,
+        'actual_delivery_date': actual_delivery.where(delivered),
+        'processing_time': processing_time,
+        'shipping_time': shipping_time,
+        'order_status': pd.Categorical.from_codes(status_idx, STATUS_OPTIONS),
+        'is_fulfilled': delivered.astype(int),
+        'warehouse_name': pd.Categorical.from_codes(
+            warehouse_idx, [f'Warehouse #{i}' for i in range(1, num_warehouses + 1)]),
+        'warehouse_location': pd.Categorical.from_codes(
+            warehouse_location_idx[warehouse_idx], WAREHOUSE_LOCATIONS),
+        'team_assignment': pd.Categorical.from_codes(
+            team_assignment_idx[warehouse_idx], TEAM_ASSIGNMENTS),
+        'product_name': pd.Categorical.from_codes(
+            product_idx, [f'Product {i}' for i in range(1, num_products + 1)]),
+        'product_category': pd.Categorical.from_codes(
+            product_category_idx[product_idx], PRODUCT_CATEGORIES),
+        'brand': pd.Categorical.from_codes(brand_idx[product_idx], BRANDS),
+    })
+
+@functools.lru_cache(maxsize=SAMPLE_DATA_CACHE_SIZE)
+def _cached_sample_data(num_orders, num_warehouses, num_products, seed, day):
+    # `day` only keys the cache so the "last 60 days" window rolls over daily
+    return generate_sample_data(num_orders=num_orders, num_warehouses=num_warehouses,
+                                num_products=num_products, seed=seed)
 
-def get_sample_data():
+def get_sample_data(num_orders=200, num_warehouses=5, num_products=20, seed=42):
     """
-    Return sample data DataFrame for dashboard display
+    Return sample data DataFrame for dashboard display.
+    Generated frames are memoized per (size, seed) in a bounded LRU shared by
+    all sessions; callers get a shallow copy so adding or replacing columns
+    never alters the cached frame.
     """
-    return generate_sample_data()
+    cached = _cached_sample_data(num_orders, num_warehouses, num_products, seed,
+                                 datetime.date.today())
+    return cached.copy(deep=False)
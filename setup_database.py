@@ -1,44 +1,99 @@
+import csv
+import io
 import os
-import psycopg2
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import random
+import threading
+import time
 import streamlit as st
 
+from db_pool import get_pool
+
+# Bump whenever setup_database() creates or changes schema objects
+SCHEMA_VERSION = 3
+
+# Arbitrary key for the advisory lock that serializes setup across processes
+SETUP_LOCK_KEY = 724011
+
+# Arbitrary key for the advisory lock held while refreshing the KPI view
+KPI_VIEW_REFRESH_LOCK_KEY = 724012
+
+# Arbitrary key for the advisory lock held while maintaining order partitions
+PARTITION_MAINTENANCE_LOCK_KEY = 724013
+
+_setup_lock = threading.Lock()
+_setup_done = False
+
 def get_db_connection():
     """
-    Create a connection to the PostgreSQL database using environment variables
+    Check out a connection to the PostgreSQL database from the shared pool
     """
     try:
-        # Try using the complete DATABASE_URL if available
-        database_url = os.getenv("DATABASE_URL")
-        if database_url:
-            # Modify the connection parameters to ensure proper connection
-            conn = psycopg2.connect(
-                database_url,
-                # Set a timeout to avoid long connection attempts
-                connect_timeout=3
-            )
-            return conn
-        
-        # Otherwise use individual connection parameters with explicit host
-        conn = psycopg2.connect(
-            host=os.getenv("PGHOST", "127.0.0.1"),  # Use IP directly instead of 'localhost'
-            database=os.getenv("PGDATABASE", "postgres"),
-            user=os.getenv("PGUSER", "postgres"),
-            password=os.getenv("PGPASSWORD", ""),
-            port=os.getenv("PGPORT", "5432"),
-            # Set a timeout to avoid long connection attempts
-            connect_timeout=3
-        )
-        return conn
+        return get_pool().getconn()
     except Exception as e:
         print(f"Database connection error: {e}")
         return None
 
-def setup_database():
+def get_schema_version(conn):
     """
-    Set up the database tables if they don't exist
+    Return the schema version recorded in the database, or 0 if none is recorded
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        result = cursor.fetchone()
+        return result[0] if result and result[0] is not None else 0
+    except Exception:
+        # The marker table doesn't exist until the first setup completes
+        return 0
+    finally:
+        conn.rollback()
+
+def ensure_database_setup():
+    """
+    Run setup_database() at most once per process, skipping it entirely when
+    the recorded schema version is already current
+    """
+    global _setup_done
+    if _setup_done:
+        return True
+
+    with _setup_lock:
+        if _setup_done:
+            return True
+
+        conn = get_db_connection()
+        if conn is None:
+            print("Could not connect to database. Setup failed.")
+            return False
+
+        try:
+            version = get_schema_version(conn)
+        finally:
+            get_pool().putconn(conn)
+
+        if version >= SCHEMA_VERSION:
+            # Schema is current; only roll the partition window forward
+            conn = get_db_connection()
+            if conn is not None:
+                try:
+                    maintain_order_partitions(conn)
+                    conn.commit()
+                    get_pool().putconn(conn)
+                except Exception as e:
+                    print(f"Error maintaining order partitions: {e}")
+                    get_pool().putconn(conn, close=True)
+            _setup_done = True
+            return True
+
+        _setup_done = setup_database()
+        return _setup_done
+
+def setup_database(num_orders=None, batch_size=None):
+    """
+    Set up the database tables if they don't exist, seeding an empty database
+    with num_orders sample orders (see insert_sample_data)
     """
     conn = get_db_connection()
     if conn is None:
@@ -47,6 +102,10 @@ def setup_database():
     
     try:
         cursor = conn.cursor()
+
+        # Serialize concurrent setups from other processes; the lock is held
+        # for the session so it also covers the sample data insertion below
+        acquire_setup_lock(conn)
         
         # Create warehouses table
         cursor.execute("""
@@ -68,20 +127,52 @@ def setup_database():
         )
         """)
         
-        # Create orders table
+        # Create orders table, range-partitioned by month if requested
+        if orders_partitioning_enabled():
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id SERIAL,
+                warehouse_id INTEGER REFERENCES warehouses(warehouse_id),
+                product_id INTEGER REFERENCES products(product_id),
+                quantity INTEGER NOT NULL,
+                order_date DATE NOT NULL,
+                expected_delivery_date DATE NOT NULL,
+                actual_delivery_date DATE,
+                processing_time FLOAT NOT NULL,
+                shipping_time FLOAT,
+                order_status VARCHAR(20) NOT NULL,
+                is_fulfilled BOOLEAN NOT NULL,
+                PRIMARY KEY (order_id, order_date)
+            ) PARTITION BY RANGE (order_date)
+            """)
+        else:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id SERIAL PRIMARY KEY,
+                warehouse_id INTEGER REFERENCES warehouses(warehouse_id),
+                product_id INTEGER REFERENCES products(product_id),
+                quantity INTEGER NOT NULL,
+                order_date DATE NOT NULL,
+                expected_delivery_date DATE NOT NULL,
+                actual_delivery_date DATE,
+                processing_time FLOAT NOT NULL,
+                shipping_time FLOAT,
+                order_status VARCHAR(20) NOT NULL,
+                is_fulfilled BOOLEAN NOT NULL
+            )
+            """)
+        
+        # Create the monthly partitions around today, if partitioned
+        maintain_order_partitions(conn)
+        
+        # Create the daily rollup read by the trend charts
+        create_daily_rollup(cursor)
+        
+        # Create schema version marker table
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            order_id SERIAL PRIMARY KEY,
-            warehouse_id INTEGER REFERENCES warehouses(warehouse_id),
-            product_id INTEGER REFERENCES products(product_id),
-            quantity INTEGER NOT NULL,
-            order_date DATE NOT NULL,
-            expected_delivery_date DATE NOT NULL,
-            actual_delivery_date DATE,
-            processing_time FLOAT NOT NULL,
-            shipping_time FLOAT,
-            order_status VARCHAR(20) NOT NULL,
-            is_fulfilled BOOLEAN NOT NULL
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
         )
         """)
         
@@ -101,23 +192,486 @@ def setup_database():
         if warehouse_count == 0:
             print("Inserting sample data into the database...")
             # Insert sample data
-            insert_sample_data(conn)
+            insert_sample_data(conn, num_orders, batch_size)
+            
+            # Create indexes for the date-range filter and joins once the
+            # orders are in; one sorted build per index is far cheaper than
+            # updating them row by row during the COPY
+            create_order_indexes(cursor)
+            conn.commit()
+            
+            # Refresh planner statistics so the new indexes get used
+            cursor.execute("ANALYZE orders")
         else:
             print(f"Database already has {warehouse_count} warehouses. Skipping sample data insertion.")
+            
+            # Add any missing indexes without blocking writes to the orders
+            create_order_indexes_online(conn)
+        
+        # Roll up the existing orders
+        refresh_daily_rollup(conn)
         
-        conn.close()
+        # Record the schema version so later startups can skip setup
+        cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (SETUP_LOCK_KEY,))
+        conn.commit()
+        
+        get_pool().putconn(conn)
         return True
     
     except Exception as e:
         print(f"Error setting up database: {e}")
         if conn:
-            conn.close()
+            # Closing the session also releases the advisory lock
+            get_pool().putconn(conn, close=True)
+        return False
+
+def acquire_setup_lock(conn, poll_interval=0.5):
+    """
+    Take the session-level setup advisory lock, polling with
+    pg_try_advisory_lock outside a transaction. A backend blocked in
+    pg_advisory_lock holds a snapshot, which CREATE INDEX CONCURRENTLY in
+    the setup holding the lock would wait on.
+    """
+    cursor = conn.cursor()
+    conn.autocommit = True
+    try:
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (SETUP_LOCK_KEY,))
+            if cursor.fetchone()[0]:
+                return
+            time.sleep(poll_interval)
+    finally:
+        conn.autocommit = False
+
+def orders_partitioning_enabled():
+    """
+    Whether new databases should create orders as a monthly partitioned table
+    (opt-in via the ORDERS_PARTITIONED environment variable)
+    """
+    return os.getenv("ORDERS_PARTITIONED", "0").lower() in ("1", "true", "yes")
+
+def is_orders_partitioned(cursor):
+    """
+    Check whether the existing orders table is a partitioned table
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('orders')")
+    result = cursor.fetchone()
+    return result is not None and result[0] == 'p'
+
+def _month_start(day):
+    return day.replace(day=1)
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return day.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+def order_partition_name(month_start):
+    """
+    Name of the monthly orders partition starting at month_start
+    """
+    return f"orders_y{month_start.year}m{month_start.month:02d}"
+
+def create_order_partitions(cursor, start_date, end_date):
+    """
+    Create (idempotently) monthly orders partitions covering start_date..end_date.
+    Rows the default partition already holds for a new month are moved into
+    that month's partition, since PostgreSQL refuses to create it otherwise.
+    """
+    cursor.execute("SELECT to_regclass('orders_default') IS NOT NULL")
+    has_default = cursor.fetchone()[0]
+    
+    month = _month_start(start_date)
+    while month <= end_date:
+        next_month = _add_months(month, 1)
+        name = order_partition_name(month)
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is None:
+            moved = 0
+            if has_default:
+                # Park the month's rows while the partition is created
+                cursor.execute("CREATE TEMP TABLE orders_moving (LIKE orders)")
+                cursor.execute("""
+                WITH moved AS (
+                    DELETE FROM orders_default
+                    WHERE order_date >= %s AND order_date < %s
+                    RETURNING *
+                )
+                INSERT INTO orders_moving SELECT * FROM moved
+                """, (month, next_month))
+                moved = cursor.rowcount
+            
+            cursor.execute(f"""
+            CREATE TABLE {name}
+            PARTITION OF orders FOR VALUES FROM (%s) TO (%s)
+            """, (month, next_month))
+            
+            if has_default:
+                cursor.execute("INSERT INTO orders SELECT * FROM orders_moving")
+                cursor.execute("DROP TABLE orders_moving")
+                if moved:
+                    print(f"Moved {moved} orders from orders_default to {name}")
+        month = next_month
+
+def archive_order_partitions(cursor, retention_months, archive_schema="orders_archive"):
+    """
+    Detach monthly partitions older than retention_months and move them to
+    archive_schema, where they stay queryable but out of dashboard scans
+    """
+    cutoff = _add_months(datetime.now().date(), -retention_months)
+    cursor.execute("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass('orders')
+    """)
+    archived = []
+    for (name,) in cursor.fetchall():
+        try:
+            month = datetime.strptime(name, "orders_y%Ym%m").date()
+        except ValueError:
+            # The default partition and any hand-made partitions are left alone
+            continue
+        if _add_months(month, 1) <= cutoff:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}")
+            cursor.execute(f"ALTER TABLE orders DETACH PARTITION {name}")
+            cursor.execute(f"ALTER TABLE {name} SET SCHEMA {archive_schema}")
+            archived.append(name)
+    return archived
+
+def maintain_order_partitions(conn):
+    """
+    If orders is partitioned, make sure partitions exist from last month up
+    to ORDERS_PARTITION_MONTHS_AHEAD months ahead (plus a default partition
+    for anything outside that window), and archive partitions older than
+    ORDERS_PARTITION_RETENTION_MONTHS when that is set. Skipped if another
+    session is already maintaining them.
+    """
+    cursor = conn.cursor()
+    if not is_orders_partitioned(cursor):
+        return
+    
+    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (PARTITION_MAINTENANCE_LOCK_KEY,))
+    if not cursor.fetchone()[0]:
+        return
+    
+    today = datetime.now().date()
+    months_ahead = int(os.getenv("ORDERS_PARTITION_MONTHS_AHEAD", "3"))
+    create_order_partitions(cursor, _add_months(today, -1), _add_months(today, months_ahead))
+    cursor.execute("CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT")
+    
+    retention_months = os.getenv("ORDERS_PARTITION_RETENTION_MONTHS")
+    if retention_months:
+        archived = archive_order_partitions(cursor, int(retention_months))
+        if archived:
+            print(f"Archived order partitions: {', '.join(archived)}")
+
+def create_order_indexes(cursor, covering=None, concurrently=False):
+    """
+    Create (idempotently) the indexes used by the dashboard's date-range query.
+    The optional covering index carries every orders column the dashboard
+    selects so the query can be served by an index-only scan; it is enabled
+    with covering=True or the DB_COVERING_INDEX environment variable.
+    With concurrently=True the indexes are built with CREATE INDEX
+    CONCURRENTLY, which doesn't block writes; the cursor's connection must
+    then be in autocommit mode.
+    """
+    if covering is None:
+        covering = os.getenv("DB_COVERING_INDEX", "0").lower() in ("1", "true", "yes")
+    
+    create_index = "CREATE INDEX IF NOT EXISTS"
+    if concurrently:
+        create_index = "CREATE INDEX CONCURRENTLY IF NOT EXISTS"
+        # An interrupted concurrent build leaves an invalid index behind,
+        # which IF NOT EXISTS would keep; drop it so it is rebuilt
+        cursor.execute("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass('orders')
+            AND NOT i.indisvalid
+            AND c.relname LIKE 'idx\\_orders\\_%'
+        """)
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    
+    # Date-range filter on its own
+    cursor.execute(f"{create_index} idx_orders_order_date ON orders (order_date)")
+    
+    # Per-warehouse date-range lookups and the warehouses join
+    cursor.execute(f"""
+    {create_index} idx_orders_warehouse_date
+    ON orders (warehouse_id, order_date)
+    """)
+    
+    # Products join
+    cursor.execute(f"""
+    {create_index} idx_orders_product_date
+    ON orders (product_id, order_date)
+    """)
+    
+    if covering:
+        cursor.execute(f"""
+        {create_index} idx_orders_date_covering
+        ON orders (order_date, warehouse_id, product_id)
+        INCLUDE (order_id, quantity, expected_delivery_date, actual_delivery_date,
+                 processing_time, shipping_time, order_status, is_fulfilled)
+        """)
+
+def create_order_indexes_online(conn):
+    """
+    Create any missing dashboard indexes on a populated orders table. An
+    unpartitioned table is indexed concurrently, so the dashboard and order
+    writers keep running while the indexes build. Partitioned tables don't
+    support CREATE INDEX CONCURRENTLY, so there each missing index blocks
+    writes while it builds; run the setup as an offline migration then.
+    """
+    cursor = conn.cursor()
+    if is_orders_partitioned(cursor):
+        create_order_indexes(cursor)
+        conn.commit()
+        return
+    
+    conn.commit()
+    conn.autocommit = True
+    try:
+        create_order_indexes(cursor, concurrently=True)
+    finally:
+        conn.autocommit = False
+
+def create_daily_rollup(cursor):
+    """
+    Create (idempotently) the per day, warehouse and product category rollup
+    of orders and the watermark recording the last order it has seen
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS orders_daily_rollup (
+        order_date DATE NOT NULL,
+        warehouse_id INTEGER NOT NULL,
+        product_category VARCHAR(50) NOT NULL,
+        order_count INTEGER NOT NULL,
+        sum_processing_time FLOAT NOT NULL,
+        delayed_count INTEGER NOT NULL,
+        fulfilled_count INTEGER NOT NULL,
+        PRIMARY KEY (order_date, warehouse_id, product_category)
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS orders_rollup_watermark (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        last_order_id INTEGER NOT NULL DEFAULT 0,
+        refreshed_at TIMESTAMP
+    )
+    """)
+    cursor.execute("INSERT INTO orders_rollup_watermark DEFAULT VALUES ON CONFLICT DO NOTHING")
+
+def refresh_daily_rollup(conn, recent_days=None):
+    """
+    Bring orders_daily_rollup up to date. Only the days that received orders
+    since the last refresh (by order_id watermark) are recomputed, plus the
+    last recent_days days (ROLLUP_RECENT_DAYS, default 7) so status and
+    delivery updates to recent orders, and late-committing inserts, are
+    picked up too. Returns the number of days recomputed.
+    """
+    if recent_days is None:
+        recent_days = int(os.getenv("ROLLUP_RECENT_DAYS", "7"))
+    
+    cursor = conn.cursor()
+    
+    # Locking the watermark row serializes refreshes across processes
+    cursor.execute("SELECT last_order_id FROM orders_rollup_watermark FOR UPDATE")
+    last_order_id = cursor.fetchone()[0]
+    
+    cursor.execute("SELECT COALESCE(MAX(order_id), 0) FROM orders")
+    max_order_id = cursor.fetchone()[0]
+    
+    cursor.execute("""
+    SELECT DISTINCT order_date FROM orders WHERE order_id > %s AND order_id <= %s
+    UNION
+    SELECT generate_series(CURRENT_DATE - %s, CURRENT_DATE, INTERVAL '1 day')::date
+    """, (last_order_id, max_order_id, recent_days))
+    days = [row[0] for row in cursor.fetchall()]
+    
+    cursor.execute("DELETE FROM orders_daily_rollup WHERE order_date = ANY(%s)", (days,))
+    cursor.execute("""
+    INSERT INTO orders_daily_rollup (
+        order_date, warehouse_id, product_category, order_count,
+        sum_processing_time, delayed_count, fulfilled_count
+    )
+    SELECT 
+        o.order_date,
+        o.warehouse_id,
+        p.product_category,
+        COUNT(*),
+        SUM(o.processing_time),
+        SUM(COALESCE(o.actual_delivery_date > o.expected_delivery_date, FALSE)::int),
+        SUM(o.is_fulfilled::int)
+    FROM 
+        orders o
+    JOIN 
+        products p ON o.product_id = p.product_id
+    WHERE 
+        o.order_date = ANY(%s)
+        -- Orders without a warehouse are left out, as by the dashboard's join
+        AND o.warehouse_id IS NOT NULL
+    GROUP BY 
+        o.order_date, o.warehouse_id, p.product_category
+    """, (days,))
+    
+    cursor.execute("""
+    UPDATE orders_rollup_watermark SET last_order_id = %s, refreshed_at = NOW()
+    """, (max_order_id,))
+    return len(days)
+
+def warehouse_kpi_view_enabled():
+    """
+    Whether the dashboard should maintain and read the warehouse_daily_kpis
+    materialized view (opt-in via the WAREHOUSE_KPI_VIEW environment variable)
+    """
+    return os.getenv("WAREHOUSE_KPI_VIEW", "0").lower() in ("1", "true", "yes")
+
+def create_warehouse_kpi_view(cursor):
+    """
+    Create (idempotently) the materialized view of per warehouse, day and
+    product category KPIs, with the unique index REFRESH CONCURRENTLY needs
+    and a table recording when it was last refreshed
+    """
+    cursor.execute("""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse_daily_kpis AS
+    SELECT 
+        o.order_date,
+        o.warehouse_id,
+        p.product_category,
+        COUNT(*) AS order_count,
+        SUM(o.processing_time) AS sum_processing_time,
+        SUM(COALESCE(o.actual_delivery_date > o.expected_delivery_date, FALSE)::int) AS delayed_count,
+        SUM(o.is_fulfilled::int) AS fulfilled_count
+    FROM 
+        orders o
+    JOIN 
+        products p ON o.product_id = p.product_id
+    GROUP BY 
+        o.order_date, o.warehouse_id, p.product_category
+    """)
+    
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_warehouse_daily_kpis_key
+    ON warehouse_daily_kpis (order_date, warehouse_id, product_category)
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS warehouse_kpi_view_refresh (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """)
+    cursor.execute("INSERT INTO warehouse_kpi_view_refresh DEFAULT VALUES ON CONFLICT DO NOTHING")
+
+def refresh_warehouse_kpi_view(conn):
+    """
+    Refresh warehouse_daily_kpis without blocking readers, creating it on
+    first use. Returns False without refreshing if another process is
+    already refreshing it.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (KPI_VIEW_REFRESH_LOCK_KEY,))
+    if not cursor.fetchone()[0]:
         return False
+    
+    cursor.execute("SELECT to_regclass('warehouse_daily_kpis')")
+    if cursor.fetchone()[0] is None:
+        # Creating the view populates it
+        create_warehouse_kpi_view(cursor)
+        return True
+    
+    cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY warehouse_daily_kpis")
+    cursor.execute("UPDATE warehouse_kpi_view_refresh SET refreshed_at = NOW()")
+    return True
+
+ORDER_COLUMNS = [
+    'warehouse_id', 'product_id', 'quantity',
+    'order_date', 'expected_delivery_date', 'actual_delivery_date',
+    'processing_time', 'shipping_time', 'order_status', 'is_fulfilled'
+]
+
+def copy_rows(cursor, table, columns, buffer):
+    """
+    Bulk load CSV rows from a text buffer into table with COPY FROM STDIN
+    """
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
 
-def insert_sample_data(conn):
+def generate_order_batches(warehouse_ids, product_ids, num_orders, batch_size,
+                           start_date, days=30, seed=None):
     """
-    Insert sample data into the database
+    Yield DataFrames of at most batch_size random orders placed within `days`
+    days after start_date, so arbitrarily many orders can be generated in
+    constant memory
     """
+    rng = np.random.default_rng(seed)
+    warehouse_ids = np.asarray(warehouse_ids)
+    product_ids = np.asarray(product_ids)
+    start = np.datetime64(start_date, 'D')
+    
+    for offset in range(0, num_orders, batch_size):
+        n = min(batch_size, num_orders - offset)
+        
+        order_date = start + rng.integers(0, days + 1, n)
+        expected_delivery_date = order_date + rng.integers(1, 8, n)
+        
+        # Processing time between 1 and 36 hours
+        processing_time = np.round(rng.uniform(1, 36, n), 2)
+        
+        # 80% of orders are fulfilled
+        is_fulfilled = rng.random(n) < 0.8
+        
+        # Fulfilled orders are delivered, 30% of them 1-3 days late
+        delay_days = np.where(rng.random(n) < 0.3, rng.integers(1, 4, n), 0)
+        actual_delivery_date = np.where(
+            is_fulfilled,
+            expected_delivery_date + delay_days,
+            np.datetime64('NaT')
+        )
+        
+        # Not fulfilled orders are either processing or shipped
+        is_processing = ~is_fulfilled & (rng.random(n) < 0.5)
+        order_status = np.where(
+            is_fulfilled, 'Delivered', np.where(is_processing, 'Processing', 'Shipped')
+        )
+        shipping_time = np.where(
+            is_fulfilled,
+            np.round(rng.uniform(12, 72, n), 2),
+            np.where(is_processing, np.nan, np.round(rng.uniform(12, 48, n), 2))
+        )
+        
+        yield pd.DataFrame({
+            'warehouse_id': rng.choice(warehouse_ids, n),
+            'product_id': rng.choice(product_ids, n),
+            'quantity': rng.integers(1, 6, n),
+            'order_date': order_date,
+            'expected_delivery_date': expected_delivery_date,
+            'actual_delivery_date': actual_delivery_date,
+            'processing_time': processing_time,
+            'shipping_time': shipping_time,
+            'order_status': order_status,
+            'is_fulfilled': is_fulfilled,
+        }, columns=ORDER_COLUMNS)
+
+def insert_sample_data(conn, num_orders=None, batch_size=None):
+    """
+    Insert sample data into the database using COPY. The number of orders and
+    the rows streamed per COPY default to the SEED_ORDER_COUNT and
+    SEED_BATCH_SIZE environment variables (200 and 100,000).
+    """
+    if num_orders is None:
+        num_orders = int(os.getenv("SEED_ORDER_COUNT", "200"))
+    if batch_size is None:
+        batch_size = int(os.getenv("SEED_BATCH_SIZE", "100000"))
+    
     cursor = conn.cursor()
     
     # Insert warehouses
@@ -129,11 +683,10 @@ def insert_sample_data(conn):
         ('Midwest Logistics', 'Columbus, OH', 'Brand Team')
     ]
     
-    for w in warehouses:
-        cursor.execute(
-            "INSERT INTO warehouses (warehouse_name, warehouse_location, team_assignment) VALUES (%s, %s, %s)",
-            w
-        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(warehouses)
+    copy_rows(cursor, 'warehouses',
+              ['warehouse_name', 'warehouse_location', 'team_assignment'], buffer)
     
     # Insert products
     products = [
@@ -149,11 +702,9 @@ def insert_sample_data(conn):
         ('Backpack', 'Accessories', 'TravelEase')
     ]
     
-    for p in products:
-        cursor.execute(
-            "INSERT INTO products (product_name, product_category, brand) VALUES (%s, %s, %s)",
-            p
-        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(products)
+    copy_rows(cursor, 'products', ['product_name', 'product_category', 'brand'], buffer)
     
     # Get the IDs of inserted warehouses and products
     cursor.execute("SELECT warehouse_id FROM warehouses")
@@ -162,66 +713,32 @@ def insert_sample_data(conn):
     cursor.execute("SELECT product_id FROM products")
     product_ids = [row[0] for row in cursor.fetchall()]
     
-    # Generate 200 random orders over the last 30 days
-    orders = []
+    # Generate random orders over the last 30 days
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=30)
     
-    order_statuses = ['Processing', 'Shipped', 'Delivered', 'Cancelled']
+    # Route the orders into monthly partitions rather than the default one
+    if is_orders_partitioned(cursor):
+        create_order_partitions(cursor, start_date, end_date)
     
-    for i in range(200):
-        # Random dates within the last 30 days
-        order_date = start_date + timedelta(days=random.randint(0, 30))
-        expected_delivery_date = order_date + timedelta(days=random.randint(1, 7))
-        
-        # Processing time between 1 and 36 hours
-        processing_time = round(random.uniform(1, 36), 2)
-        
-        # 80% of orders are fulfilled
-        is_fulfilled = random.random() < 0.8
-        
-        # Set status and actual delivery date based on fulfillment
-        if is_fulfilled:
-            order_status = 'Delivered'
-            shipping_time = round(random.uniform(12, 72), 2)
-            actual_delivery_date = expected_delivery_date
-            
-            # 70% of orders arrive on time, 30% are delayed
-            if random.random() < 0.3:
-                actual_delivery_date += timedelta(days=random.randint(1, 3))
-                
-        else:
-            # Not fulfilled orders are either processing or shipped
-            order_status = 'Processing' if random.random() < 0.5 else 'Shipped'
-            shipping_time = None if order_status == 'Processing' else round(random.uniform(12, 48), 2)
-            actual_delivery_date = None
-        
-        orders.append((
-            random.choice(warehouse_ids),
-            random.choice(product_ids),
-            random.randint(1, 5),  # quantity
-            order_date,
-            expected_delivery_date,
-            actual_delivery_date,
-            processing_time,
-            shipping_time,
-            order_status,
-            is_fulfilled
-        ))
-    
-    # Insert orders
-    for o in orders:
-        cursor.execute("""
-        INSERT INTO orders (
-            warehouse_id, product_id, quantity, 
-            order_date, expected_delivery_date, actual_delivery_date,
-            processing_time, shipping_time, order_status, is_fulfilled
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, o)
+    # Stream the orders one batch at a time so memory stays flat
+    for batch in generate_order_batches(warehouse_ids, product_ids, num_orders,
+                                        batch_size, start_date):
+        buffer = io.StringIO()
+        batch.to_csv(buffer, header=False, index=False, na_rep='')
+        copy_rows(cursor, 'orders', ORDER_COLUMNS, buffer)
     
     # Commit all changes
     conn.commit()
-    print(f"Inserted {len(warehouses)} warehouses, {len(products)} products, and {len(orders)} orders")
+    print(f"Inserted {len(warehouses)} warehouses, {len(products)} products, and {num_orders} orders")
 
 if __name__ == "__main__":
-    setup_database()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Create the dashboard schema and seed sample data")
+    parser.add_argument("--orders", type=int, default=None,
+                        help="number of sample orders to seed into an empty database")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="orders streamed per COPY batch")
+    args = parser.parse_args()
+    setup_database(num_orders=args.orders, batch_size=args.batch_size)
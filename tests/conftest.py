@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that query PostgreSQL run only when DATABASE_URL points at a server
+requires_database = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL"), reason="DATABASE_URL is not set")
+
+def seed_orders(conn, df):
+    """
+    Create temporary warehouses, products and orders tables on conn, which
+    shadow the real ones for that connection only, and fill them with the
+    rows of a sample_data frame
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TEMP TABLE warehouses (
+        warehouse_id INTEGER PRIMARY KEY,
+        warehouse_name VARCHAR(100) NOT NULL,
+        warehouse_location VARCHAR(100) NOT NULL,
+        team_assignment VARCHAR(50) NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TEMP TABLE products (
+        product_id INTEGER PRIMARY KEY,
+        product_name VARCHAR(100) NOT NULL,
+        product_category VARCHAR(50) NOT NULL,
+        brand VARCHAR(50) NOT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TEMP TABLE orders (
+        order_id INTEGER PRIMARY KEY,
+        warehouse_id INTEGER,
+        product_id INTEGER,
+        quantity INTEGER NOT NULL,
+        order_date DATE NOT NULL,
+        expected_delivery_date DATE NOT NULL,
+        actual_delivery_date DATE,
+        processing_time FLOAT NOT NULL,
+        shipping_time FLOAT,
+        order_status VARCHAR(20) NOT NULL,
+        is_fulfilled BOOLEAN NOT NULL
+    )
+    """)
+    
+    warehouses = df[['warehouse_id', 'warehouse_name', 'warehouse_location',
+                     'team_assignment']].drop_duplicates('warehouse_id')
+    cursor.executemany("INSERT INTO warehouses VALUES (%s, %s, %s, %s)",
+                       [(int(row[0]),) + tuple(row[1:]) for row in warehouses.itertuples(index=False)])
+    products = df[['product_id', 'product_name', 'product_category',
+                   'brand']].drop_duplicates('product_id')
+    cursor.executemany("INSERT INTO products VALUES (%s, %s, %s, %s)",
+                       [(int(row[0]),) + tuple(row[1:]) for row in products.itertuples(index=False)])
+    
+    def day(value):
+        return None if value is None or value != value else value.date()
+    
+    cursor.executemany(
+        "INSERT INTO orders VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        [(int(row.order_id), int(row.warehouse_id), int(row.product_id), int(row.quantity),
+          day(row.order_date), day(row.expected_delivery_date), day(row.actual_delivery_date),
+          float(row.processing_time), float(row.shipping_time), row.order_status,
+          bool(row.is_fulfilled))
+         for row in df.itertuples(index=False)])
+    cursor.execute("ANALYZE warehouses; ANALYZE products; ANALYZE orders")
+    conn.commit()
+
+@pytest.fixture
+def seed_database(monkeypatch):
+    """
+    Route the database module's queries to one connection, bypassing the
+    result caches. Returns a function that seeds a frame into temporary
+    tables on that connection (see seed_orders) and returns the frame.
+    """
+    import database
+    from db_pool import create_connection
+    from query_cache import query_cache, range_cache
+    
+    conn = create_connection()
+    monkeypatch.setattr(database, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(database, "release_db_connection", lambda conn, close=False: None)
+    monkeypatch.setattr(database, "WAREHOUSE_DATA_SHARDS", 1)
+    database._kpi_view_ready.clear()
+    query_cache.clear()
+    range_cache.clear()
+    
+    def seed(df):
+        seed_orders(conn, df)
+        return df
+    
+    try:
+        yield seed
+    finally:
+        query_cache.clear()
+        range_cache.clear()
+        conn.close()
+
+@pytest.fixture
+def warehouse_db(seed_database):
+    """
+    Seed the sample orders, with dates truncated to days as stored, and
+    return them
+    """
+    from sample_data import generate_sample_data
+    
+    df = generate_sample_data(num_orders=300, seed=7)
+    for column in ['order_date', 'expected_delivery_date', 'actual_delivery_date']:
+        df[column] = df[column].dt.normalize()
+    return seed_database(df)
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+import data_processor
+from data_processor import encode_categoricals
+
+@pytest.fixture(autouse=True)
+def fresh_categories(monkeypatch):
+    # Categories are registered process-wide; start each test from none
+    monkeypatch.setattr(data_processor, '_known_categories', {})
+
+def test_string_columns_become_categoricals():
+    df = pd.DataFrame({'warehouse_name': ['North', 'South', 'North'], 'order_id': [1, 2, 3]})
+    
+    encoded = encode_categoricals(df)
+    
+    assert isinstance(encoded['warehouse_name'].dtype, pd.CategoricalDtype)
+    assert list(encoded['warehouse_name']) == ['North', 'South', 'North']
+    assert encoded['order_id'].dtype == df['order_id'].dtype
+    # The input frame is left alone
+    assert not isinstance(df['warehouse_name'].dtype, pd.CategoricalDtype)
+
+def test_codes_stay_the_same_across_refreshes():
+    first = encode_categoricals(pd.DataFrame({'brand': ['Acme', 'Globex']}))
+    second = encode_categoricals(pd.DataFrame({'brand': ['Initech', 'Globex', 'Acme']}))
+    
+    assert list(second['brand'].cat.categories) == ['Acme', 'Globex', 'Initech']
+    assert list(first['brand'].cat.codes) == [0, 1]
+    assert list(second['brand'].cat.codes) == [2, 1, 0]
+
+def test_categoricals_are_extended_without_recoding():
+    first = encode_categoricals(pd.DataFrame({'brand': ['Acme']}))
+    encode_categoricals(pd.DataFrame({'brand': ['Globex']}))
+    
+    extended = encode_categoricals(first)
+    
+    assert list(extended['brand'].cat.categories) == ['Acme', 'Globex']
+    assert list(extended['brand'].cat.codes) == [0]
+
+def test_missing_values_and_columns_are_passed_through():
+    df = pd.DataFrame({'order_status': ['Delivered', None]})
+    
+    encoded = encode_categoricals(df, columns=['order_status', 'brand'])
+    
+    assert list(encoded['order_status'].cat.categories) == ['Delivered']
+    assert encoded['order_status'].isna().tolist() == [False, True]
+    assert 'brand' not in encoded.columns
+    assert encode_categoricals(None) is None
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions, pool
+
+from db_pool import ConnectionPool, PoolTimeout
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.conn.executed.append(query)
+
+class FakeConnection:
+    """
+    Stand-in for a psycopg2 connection recording what the pool does with it
+    """
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.executed = []
+    
+    def cursor(self):
+        return FakeCursor(self)
+    
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+    
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+    
+    def close(self):
+        self.closed = 1
+
+def make_pool(**kwargs):
+    opened = []
+    
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+    
+    return ConnectionPool(connect=connect, **kwargs), opened
+
+def test_returned_connection_is_reused():
+    conn_pool, opened = make_pool()
+    
+    conn = conn_pool.getconn()
+    conn_pool.putconn(conn)
+    
+    assert conn_pool.getconn() is conn
+    assert len(opened) == 1
+    assert conn_pool.stats()['reused'] == 1
+
+def test_open_transaction_is_rolled_back_on_return():
+    conn_pool, _ = make_pool()
+    conn = conn_pool.getconn()
+    conn.in_transaction = True
+    
+    conn_pool.putconn(conn)
+    
+    assert conn.rollbacks == 1
+    assert conn_pool.stats()['idle'] == 1
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    conn_pool, _ = make_pool(maxconn=1, checkout_timeout=0.05)
+    conn_pool.getconn()
+    
+    with pytest.raises(PoolTimeout):
+        conn_pool.getconn()
+    assert conn_pool.stats()['timeouts'] == 1
+
+def test_waiting_checkout_gets_released_connection():
+    conn_pool, opened = make_pool(maxconn=1, checkout_timeout=5)
+    conn = conn_pool.getconn()
+    
+    releaser = threading.Timer(0.05, conn_pool.putconn, args=(conn,))
+    releaser.start()
+    try:
+        assert conn_pool.getconn() is conn
+    finally:
+        releaser.join()
+    assert len(opened) == 1
+    assert conn_pool.stats()['waits'] >= 1
+
+def test_failed_health_check_replaces_connection():
+    conn_pool, opened = make_pool(health_check_interval=0)
+    conn = conn_pool.getconn()
+    conn_pool.putconn(conn)
+    conn.broken = True
+    
+    replacement = conn_pool.getconn()
+    
+    assert replacement is not conn
+    assert conn.closed
+    assert len(opened) == 2
+    assert conn_pool.stats()['health_check_failures'] == 1
+
+def test_healthy_idle_connection_is_probed_before_reuse():
+    conn_pool, _ = make_pool(health_check_interval=0)
+    conn = conn_pool.getconn()
+    conn_pool.putconn(conn)
+    
+    assert conn_pool.getconn() is conn
+    assert conn.executed == ["SELECT 1"]
+
+def test_idle_connections_are_evicted_down_to_minconn():
+    conn_pool, opened = make_pool(minconn=1, idle_timeout=0.01)
+    first, second = conn_pool.getconn(), conn_pool.getconn()
+    conn_pool.putconn(first)
+    conn_pool.putconn(second)
+    time.sleep(0.02)
+    
+    # Only the most recently returned connection is kept
+    assert conn_pool.getconn() is second
+    assert first.closed
+    assert conn_pool.stats()['idle_evictions'] == 1
+
+def test_failed_connect_releases_its_slot():
+    attempts = []
+    
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("could not connect to server")
+        return FakeConnection()
+    
+    conn_pool = ConnectionPool(connect=connect, maxconn=1, checkout_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        conn_pool.getconn()
+    
+    assert conn_pool.getconn() is not None
+    assert conn_pool.stats()['size'] == 1
+
+def test_closed_pool_refuses_checkouts():
+    conn_pool, _ = make_pool()
+    conn = conn_pool.getconn()
+    conn_pool.putconn(conn)
+    
+    conn_pool.closeall()
+    
+    assert conn.closed
+    with pytest.raises(pool.PoolError):
+        conn_pool.getconn()
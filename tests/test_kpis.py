@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from data_processor import (WAREHOUSE_KEYS, calculate_avg_handling_time,
+                            calculate_delay_percentage, calculate_fulfillment_rate, compute_kpis,
+                            delayed_values, fold_kpis, fulfilled_values, kpis_from_groups,
+                            prepare_frame, processing_time_values)
+from sample_data import generate_sample_data
+
+def orders(num_orders=500, seed=3):
+    return prepare_frame(generate_sample_data(num_orders, seed=seed))
+
+def test_overall_kpis_match_the_calculate_functions():
+    df = orders()
+    
+    overall, groups = compute_kpis(df)
+    
+    assert groups is None
+    assert np.isclose(overall['avg_handling_time'], calculate_avg_handling_time(df))
+    assert np.isclose(overall['delay_percentage'], calculate_delay_percentage(df))
+    assert np.isclose(overall['fulfillment_rate'], calculate_fulfillment_rate(df))
+    assert overall['order_count'] == len(df)
+
+def test_warehouse_kpis_match_a_pandas_groupby():
+    df = orders()
+    metrics = pd.DataFrame({
+        'processing_time': processing_time_values(df),
+        'is_delayed': delayed_values(df),
+        'is_fulfilled': fulfilled_values(df),
+    })
+    expected = metrics.groupby(df['warehouse_id'].to_numpy()).agg(['mean', 'size'])
+    
+    _, groups = compute_kpis(df, by=WAREHOUSE_KEYS)
+    
+    groups = groups.set_index('warehouse_id').loc[expected.index]
+    assert np.allclose(groups['avg_processing_time'], expected[('processing_time', 'mean')])
+    assert np.allclose(groups['delay_rate'], expected[('is_delayed', 'mean')] * 100)
+    assert np.allclose(groups['fulfillment_rate'], expected[('is_fulfilled', 'mean')] * 100)
+    assert list(groups['order_count']) == list(expected[('processing_time', 'size')])
+
+def test_rows_with_a_missing_key_belong_to_no_group():
+    df = orders(50)
+    df.loc[df.index[:10], 'warehouse_id'] = np.nan
+    
+    overall, groups = compute_kpis(df, by=WAREHOUSE_KEYS)
+    
+    assert groups['order_count'].sum() == 40
+    assert overall['order_count'] == 50
+
+def test_all_missing_key_column_gives_no_groups():
+    df = orders(50)
+    df['warehouse_id'] = np.nan
+    
+    overall, groups = compute_kpis(df, by=WAREHOUSE_KEYS)
+    
+    assert groups.empty
+    assert list(groups.columns[:3]) == WAREHOUSE_KEYS
+    assert np.isclose(overall['avg_handling_time'], calculate_avg_handling_time(df))
+
+def test_empty_frame_gives_zero_kpis():
+    df = orders(10).iloc[:0]
+    
+    overall, groups = compute_kpis(df, by=WAREHOUSE_KEYS)
+    
+    assert groups.empty
+    assert overall['order_count'] == 0
+    assert overall['delay_percentage'] == 0
+
+def test_folded_chunks_give_the_same_kpis():
+    df = orders()
+    chunks = [df.iloc[start:start + 128] for start in range(0, len(df), 128)]
+    
+    overall, groups = fold_kpis(iter(chunks), by='warehouse_id')
+    expected_overall, expected_groups = compute_kpis(df, by=['warehouse_id'])
+    
+    for name, value in expected_overall.items():
+        assert np.isclose(overall[name], value), name
+    columns = ['avg_processing_time', 'delay_rate', 'fulfillment_rate', 'order_count']
+    assert list(groups['warehouse_id']) == list(expected_groups['warehouse_id'])
+    assert np.allclose(groups[columns].to_numpy(dtype=float),
+                       expected_groups[columns].to_numpy(dtype=float))
+
+def test_folding_no_chunks_gives_zero_kpis():
+    overall, groups = fold_kpis(iter([]), by=WAREHOUSE_KEYS)
+    
+    assert overall['order_count'] == 0
+    assert groups.empty
+    assert list(groups.columns[:3]) == WAREHOUSE_KEYS
+
+def test_overall_kpis_from_warehouse_metrics_match_the_orders():
+    df = orders()
+    expected, groups = compute_kpis(df, by=WAREHOUSE_KEYS)
+    
+    overall = kpis_from_groups(groups)
+    
+    for name, value in expected.items():
+        assert np.isclose(overall[name], value), name
+
+def test_overall_kpis_from_no_warehouses_are_zero():
+    _, groups = compute_kpis(orders(10).iloc[:0], by=WAREHOUSE_KEYS)
+    
+    overall = kpis_from_groups(groups)
+    
+    assert overall['order_count'] == 0
+    assert overall['avg_handling_time'] == 0
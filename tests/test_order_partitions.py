@@ -0,0 +1,63 @@
+import datetime
+import uuid
+
+import pytest
+
+from conftest import requires_database
+
+pytestmark = requires_database
+
+@pytest.fixture
+def partitioned_orders():
+    """
+    A connection whose search_path is a scratch schema holding a partitioned
+    orders table with only its default partition (temporary tables can't
+    have permanent partitions)
+    """
+    from db_pool import create_connection
+    
+    schema = f"test_partitions_{uuid.uuid4().hex[:8]}"
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET search_path TO {schema}")
+        cursor.execute("""
+        CREATE TABLE orders (
+            order_id INTEGER NOT NULL,
+            order_date DATE NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (order_id, order_date)
+        ) PARTITION BY RANGE (order_date)
+        """)
+        cursor.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+        conn.commit()
+        yield conn
+    finally:
+        conn.rollback()
+        cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+def test_maintenance_moves_default_partition_rows(partitioned_orders):
+    from setup_database import maintain_order_partitions, order_partition_name
+    
+    conn = partitioned_orders
+    cursor = conn.cursor()
+    today = datetime.date.today()
+    month_start = today.replace(day=1)
+    cursor.executemany("INSERT INTO orders VALUES (%s, %s, %s)",
+                       [(1, month_start, 1), (2, today, 2),
+                        (3, datetime.date(2000, 1, 1), 3)])
+    conn.commit()
+    
+    maintain_order_partitions(conn)
+    conn.commit()
+    
+    cursor.execute(f"SELECT order_id FROM {order_partition_name(month_start)} ORDER BY order_id")
+    assert [row[0] for row in cursor.fetchall()] == [1, 2]
+    # Rows outside the maintained window stay in the default partition
+    cursor.execute("SELECT order_id FROM orders_default")
+    assert [row[0] for row in cursor.fetchall()] == [3]
+    cursor.execute("SELECT COUNT(*) FROM orders")
+    assert cursor.fetchone()[0] == 3
@@ -0,0 +1,140 @@
+import datetime
+import threading
+import time
+
+import pandas as pd
+
+from query_cache import DateRangeCache, QueryCache, frame_nbytes, make_key, split_by_day
+
+def frame(n, value=0):
+    return pd.DataFrame({'value': [value] * n})
+
+def test_make_key_ignores_whitespace_and_midnight_datetimes():
+    day = datetime.date(2024, 3, 1)
+    midnight = datetime.datetime(2024, 3, 1)
+    
+    assert make_key("SELECT  *\n FROM orders", [day]) == \
+        make_key("SELECT * FROM orders", [midnight])
+    assert make_key("SELECT 1", [midnight.replace(hour=1)]) != make_key("SELECT 1", [day])
+
+def test_entries_expire_after_ttl():
+    cache = QueryCache(ttl=0.01)
+    cache.put('key', frame(3))
+    assert cache.get('key') is not None
+    
+    time.sleep(0.02)
+    
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['bytes'] == 0
+
+def test_least_recently_used_entries_are_evicted_to_stay_under_max_bytes():
+    nbytes = frame_nbytes(frame(100))
+    cache = QueryCache(max_bytes=int(nbytes * 2.5))
+    cache.put('a', frame(100))
+    cache.put('b', frame(100))
+    # Touch 'a' so 'b' is the least recently used
+    cache.get('a')
+    
+    cache.put('c', frame(100))
+    
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+def test_results_larger_than_the_budget_are_not_cached():
+    cache = QueryCache(max_bytes=10)
+    
+    cache.put('key', frame(100))
+    
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0
+
+def test_cached_frames_are_not_changed_by_callers():
+    cache = QueryCache()
+    cache.put('key', frame(3, value=1))
+    
+    df = cache.get('key')
+    df['value'] = 2
+    
+    assert list(cache.get('key')['value']) == [1, 1, 1]
+
+def test_concurrent_misses_load_once():
+    cache = QueryCache()
+    calls = []
+    
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return frame(3, value=7)
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert [list(df['value']) for df in results] == [[7, 7, 7]] * 5
+    assert cache._loading == {}
+
+def test_failed_loads_are_not_cached():
+    cache = QueryCache()
+    results = iter([None, frame(2)])
+    
+    assert cache.get_or_load('key', lambda: next(results)) is None
+    assert len(cache.get_or_load('key', lambda: next(results))) == 2
+
+def day(n):
+    return datetime.date(2024, 3, n)
+
+def orders(*days):
+    return pd.DataFrame({
+        'order_date': pd.to_datetime([str(d) for d in days]),
+        'order_id': range(len(days)),
+    })
+
+def test_split_by_day_keeps_row_order_and_fills_empty_days():
+    df = pd.DataFrame({
+        'order_date': [pd.Timestamp('2024-03-03'), pd.Timestamp('2024-03-01'),
+                       pd.Timestamp('2024-03-03 12:00'), pd.NaT],
+        'order_id': [1, 2, 3, 4],
+    })
+    
+    buckets = split_by_day(df, 'order_date', day(1), day(4))
+    
+    assert sorted(buckets) == [day(1), day(2), day(3), day(4)]
+    assert list(buckets[day(1)]['order_id']) == [2]
+    assert list(buckets[day(3)]['order_id']) == [1, 3]
+    assert list(buckets[day(3)].index) == [0, 1]
+    assert buckets[day(2)].empty and list(buckets[day(2)].columns) == list(df.columns)
+    assert buckets[day(4)].empty
+
+def test_get_range_fetches_only_missing_days():
+    cache = DateRangeCache()
+    fetched = []
+    
+    def fetch(first_day, last_day):
+        fetched.append((first_day, last_day))
+        days = [day(n) for n in range(1, 11) if first_day <= day(n) <= last_day]
+        return orders(*days)
+    
+    first = cache.get_range('orders', day(3), day(5), fetch)
+    wider = cache.get_range('orders', day(1), day(7), fetch)
+    
+    assert fetched == [(day(3), day(5)), (day(1), day(2)), (day(6), day(7))]
+    assert len(first) == 3
+    assert list(wider['order_date'].dt.day) == [1, 2, 3, 4, 5, 6, 7]
+    assert cache.stats()['range_fetches'] == 3
+    assert cache._loading == {}
+
+def test_failed_range_fetch_returns_none_and_caches_nothing():
+    cache = DateRangeCache()
+    
+    assert cache.get_range('orders', day(1), day(3), lambda first, last: None) is None
+    assert cache.stats()['entries'] == 0
+    assert cache._loading == {}
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor import (PROCESS_STAGES, assign_stages, identify_bottlenecks, prepare_frame,
+                            processing_time_values, summarize_stage_histogram, summarize_stages)
+from sample_data import generate_sample_data
+from visualizations import create_bottleneck_chart
+
+SHIFT_STAGES = {
+    'labels': ['Same Shift', 'Next Shift'],
+    'edges': [0, 8, float('inf')],
+    'closed': 'left',
+}
+
+def stage_histogram(stages):
+    """
+    Per-warehouse histogram shaped like database.get_stage_histogram_sql
+    """
+    histogram = pd.DataFrame({
+        'warehouse_id': [1, 1, 2],
+        'warehouse_name': ['North', 'North', 'South'],
+        'stage': [0, 1, 1],
+        'order_count': [3, 1, 2],
+        'total_time': [6.0, 9.0, 30.0],
+    })
+    histogram.attrs['stages'] = stages
+    return histogram
+
+def test_stage_edges_follow_the_closed_side():
+    values = np.array([0, 0.5, 1, 2.9, 3, 10, 250, -1, np.nan])
+    
+    assert list(assign_stages(values, PROCESS_STAGES)) == [0, 0, 1, 1, 2, 4, 4, -1, -1]
+    
+    right_closed = dict(PROCESS_STAGES, closed='right')
+    assert list(assign_stages(values, right_closed))[:5] == [-1, 0, 0, 1, 1]
+
+def test_stage_summary_matches_a_mask_per_stage():
+    values = processing_time_values(prepare_frame(generate_sample_data(400, seed=5)))
+    
+    summary = summarize_stages(values, PROCESS_STAGES)
+    
+    edges = PROCESS_STAGES['edges']
+    for index, row in summary.iterrows():
+        in_stage = (values >= edges[index]) & (values < edges[index + 1])
+        assert row['count'] == in_stage.sum()
+        assert np.isclose(row['avg_time'], values[in_stage].mean() if in_stage.any() else 0)
+
+def test_bottlenecks_use_the_shared_stage_table():
+    df = prepare_frame(generate_sample_data(200, seed=5))
+    
+    bottlenecks = identify_bottlenecks(df)
+    
+    assert list(bottlenecks['stage'].cat.categories) == PROCESS_STAGES['labels']
+    assert bottlenecks['count'].sum() == \
+        summarize_stages(processing_time_values(df), PROCESS_STAGES)['count'].sum()
+
+def test_bottlenecks_read_a_histogram_with_its_own_stages():
+    bottlenecks = identify_bottlenecks(pd.DataFrame(), stage_histogram=stage_histogram(SHIFT_STAGES))
+    
+    assert list(bottlenecks['stage']) == ['Same Shift', 'Next Shift', 'Next Shift']
+    assert list(bottlenecks['count']) == [3, 1, 2]
+    
+    default = identify_bottlenecks(pd.DataFrame(), stage_histogram=stage_histogram(PROCESS_STAGES))
+    assert list(default['stage']) == ['Order Receipt', 'Picking', 'Picking']
+
+def test_histogram_summary_folds_warehouses_per_stage():
+    summary = summarize_stage_histogram(stage_histogram(SHIFT_STAGES))
+    
+    assert list(summary['stage']) == SHIFT_STAGES['labels']
+    assert list(summary['count']) == [3, 3]
+    assert np.allclose(summary['avg_time'], [2.0, 13.0])
+
+def test_histogram_binned_with_other_stages_is_rejected():
+    with pytest.raises(ValueError):
+        identify_bottlenecks(pd.DataFrame(), stages=PROCESS_STAGES,
+                             stage_histogram=stage_histogram(SHIFT_STAGES))
+    with pytest.raises(ValueError):
+        create_bottleneck_chart(pd.DataFrame(), stages=PROCESS_STAGES,
+                                stage_histogram=stage_histogram(SHIFT_STAGES))
+
+def test_bottleneck_chart_labels_stages_from_the_histogram():
+    fig = create_bottleneck_chart(pd.DataFrame(), stage_histogram=stage_histogram(SHIFT_STAGES))
+    
+    assert list(fig.data[0].x) == SHIFT_STAGES['labels']
+    assert list(fig.data[0].y) == [3, 3]
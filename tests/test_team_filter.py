@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+import pytest
+
+import utils
+from utils import ALL_TEAMS, compile_team_filter, filter_data_by_team, team_filter_sql
+
+@pytest.fixture(autouse=True)
+def team_presets(tmp_path, monkeypatch):
+    path = tmp_path / "team_presets.json"
+    path.write_text(json.dumps({"presets": [
+        {"name": "Brand Team",
+         "match": {"team_assignment": ["Brand"], "product_category": ["Premium"]}},
+        {"name": "Plus Team", "match": {"product_category": ["C++"]}},
+    ]}))
+    monkeypatch.setattr(utils, 'TEAM_PRESETS_FILE', str(path))
+
+def orders():
+    return pd.DataFrame({
+        'order_id': [1, 2, 3, 4, 5],
+        'team_assignment': ['Brand Squad', 'operations', None, 'BRANDING', 'Social'],
+        'product_category': ['Basic', 'premium goods', 'Premium', None, 'C++ Books'],
+    })
+
+def test_rows_matching_any_preset_column_are_kept():
+    filtered = filter_data_by_team(orders(), "Brand Team")
+    
+    assert list(filtered['order_id']) == [1, 2, 3, 4]
+
+def test_categorical_columns_filter_like_strings():
+    df = orders()
+    categorical = df.astype({'team_assignment': 'category', 'product_category': 'category'})
+    
+    assert list(filter_data_by_team(categorical, "Brand Team")['order_id']) == \
+        list(filter_data_by_team(df, "Brand Team")['order_id'])
+
+def test_preset_terms_are_matched_literally():
+    assert list(filter_data_by_team(orders(), "Plus Team")['order_id']) == [5]
+
+def test_all_teams_and_unknown_presets_do_not_filter():
+    df = orders()
+    
+    assert compile_team_filter(df, ALL_TEAMS) is None
+    assert filter_data_by_team(df, ALL_TEAMS) is df
+    assert filter_data_by_team(df, "No Such Team") is df
+
+def test_compiled_filter_looks_up_each_distinct_value():
+    compiled = compile_team_filter(orders(), "Brand Team")
+    
+    codes, lookup = compiled['team_assignment']
+    assert list(lookup[codes]) == [True, False, False, True, False]
+    # One entry per distinct value plus one for missing values
+    assert len(lookup) == 4 + 1
+
+def test_sql_predicate_uses_the_same_patterns():
+    predicate, params = team_filter_sql("Brand Team")
+    
+    assert predicate == "(w.team_assignment ~* %s OR p.product_category ~* %s)"
+    assert params == ["Brand", "Premium"]
+    assert team_filter_sql(ALL_TEAMS) == ("TRUE", [])
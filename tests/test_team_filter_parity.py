@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+from conftest import requires_database
+
+pytestmark = requires_database
+
+START_DATE = datetime.date.today() - datetime.timedelta(days=90)
+END_DATE = datetime.date.today()
+
+def team_presets():
+    from utils import get_team_presets
+    return get_team_presets()
+
+def order_ids(df):
+    return sorted(int(order_id) for order_id in df['order_id'])
+
+@pytest.mark.parametrize("team_preset", team_presets())
+def test_sql_predicate_selects_same_orders_as_pandas(warehouse_db, team_preset):
+    import database
+    from utils import filter_data_by_team, team_filter_sql
+    
+    team_clause, team_params = team_filter_sql(team_preset)
+    cursor = database.get_db_connection().cursor()
+    cursor.execute(f"""
+    SELECT o.order_id
+    FROM orders o
+    JOIN warehouses w ON o.warehouse_id = w.warehouse_id
+    JOIN products p ON o.product_id = p.product_id
+    WHERE {team_clause}
+    ORDER BY o.order_id
+    """, team_params)
+    
+    expected = order_ids(filter_data_by_team(warehouse_db, team_preset))
+    assert [row[0] for row in cursor.fetchall()] == expected
+
+@pytest.mark.parametrize("team_preset", team_presets())
+def test_get_warehouse_data_filters_like_pandas(warehouse_db, team_preset):
+    from database import get_warehouse_data
+    from utils import filter_data_by_team
+    
+    df = get_warehouse_data(START_DATE, END_DATE, columns=['order_id'],
+                            team_preset=team_preset)
+    
+    assert df.attrs.get('source') != 'sample'
+    assert df.attrs['team_preset'] == team_preset
+    assert order_ids(df) == order_ids(filter_data_by_team(warehouse_db, team_preset))
+
+def test_untranslatable_preset_is_left_to_pandas(warehouse_db, monkeypatch):
+    import utils
+    from database import get_warehouse_data
+    
+    # Brand Team matches on team_assignment, which SQL can no longer filter
+    monkeypatch.delitem(utils.TEAM_FILTER_SQL_COLUMNS, 'team_assignment')
+    
+    df = get_warehouse_data(START_DATE, END_DATE, columns=['order_id'],
+                            team_preset="Brand Team")
+    
+    assert df.attrs['team_preset'] is None
+    assert order_ids(df) == order_ids(warehouse_db)
+    assert order_ids(utils.filter_data_by_team(df, "Brand Team")) == \
+        order_ids(utils.filter_data_by_team(warehouse_db, "Brand Team"))
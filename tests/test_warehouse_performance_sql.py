@@ -0,0 +1,72 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from conftest import requires_database
+
+pytestmark = requires_database
+
+TODAY = pd.Timestamp(datetime.date.today())
+
+def day(offset):
+    return TODAY + pd.Timedelta(days=offset)
+
+def known_orders():
+    """
+    Two warehouses: one on-time, one late and one undelivered order (no
+    actual delivery date) at the first, two on-time orders at the second
+    """
+    return pd.DataFrame({
+        'order_id': [1, 2, 3, 4, 5],
+        'warehouse_id': [1, 1, 1, 2, 2],
+        'product_id': [1, 2, 1, 2, 2],
+        'quantity': [1, 2, 3, 1, 1],
+        'order_date': [day(-10), day(-9), day(-2), day(-8), day(-7)],
+        'expected_delivery_date': [day(-6), day(-5), day(2), day(-4), day(-3)],
+        'actual_delivery_date': [day(-6), day(-3), pd.NaT, day(-5), day(-3)],
+        'processing_time': [10.0, 20.0, 30.0, 5.0, 15.0],
+        'shipping_time': [48.0, 72.0, 24.0, 48.0, 48.0],
+        'order_status': ['Delivered', 'Delivered', 'Processing', 'Delivered', 'Delivered'],
+        'is_fulfilled': [1, 1, 0, 1, 1],
+        'warehouse_name': ['Warehouse #1', 'Warehouse #1', 'Warehouse #1',
+                           'Warehouse #2', 'Warehouse #2'],
+        'warehouse_location': ['Chicago', 'Chicago', 'Chicago', 'Dallas', 'Dallas'],
+        'team_assignment': ['Brand Team', 'Brand Team', 'Brand Team',
+                            'Performance Team', 'Performance Team'],
+        'product_name': ['Product 1', 'Product 2', 'Product 1', 'Product 2', 'Product 2'],
+        'product_category': ['Books', 'Food', 'Books', 'Food', 'Food'],
+        'brand': ['ValueChoice', 'EssentialGoods', 'ValueChoice', 'EssentialGoods',
+                  'EssentialGoods'],
+    })
+
+def test_sql_matches_pandas_on_known_orders(seed_database):
+    from data_processor import get_warehouse_performance, prepare_frame
+    from database import get_warehouse_performance_sql
+    
+    df = seed_database(known_orders())
+    
+    result = get_warehouse_performance_sql(day(-30).date(), TODAY.date())
+    expected = get_warehouse_performance(prepare_frame(df))
+    
+    pd.testing.assert_frame_equal(result, expected[result.columns],
+                                  check_dtype=False, check_categorical=False)
+    # The undelivered order counts as not delayed
+    assert list(result['delay_rate']) == pytest.approx([100 / 3, 0.0])
+    assert list(result['order_count']) == [3, 2]
+
+def test_sql_matches_pandas_per_team_preset(warehouse_db):
+    from data_processor import get_warehouse_performance, prepare_frame
+    from database import get_warehouse_performance_sql
+    from utils import filter_data_by_team, get_team_presets
+    
+    for team_preset in get_team_presets():
+        result = get_warehouse_performance_sql(day(-90).date(), TODAY.date(), team_preset)
+        expected = get_warehouse_performance(
+            filter_data_by_team(prepare_frame(warehouse_db), team_preset))
+        if expected.empty:
+            assert result.empty
+            continue
+    
+        pd.testing.assert_frame_equal(result, expected[result.columns],
+                                      check_dtype=False, check_categorical=False)
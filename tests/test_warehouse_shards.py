@@ -0,0 +1,71 @@
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+import database
+from db_pool import ConnectionPool, PoolTimeout
+
+START, END = datetime.date(2024, 1, 1), datetime.date(2024, 1, 30)
+
+@pytest.fixture
+def reads(monkeypatch):
+    """
+    Record the (first_day, last_day) of each read_warehouse_rows call, which
+    returns one row per call
+    """
+    calls = []
+    lock = threading.Lock()
+    
+    def read_warehouse_rows(first_day, last_day, **kwargs):
+        with lock:
+            calls.append((first_day, last_day))
+        return pd.DataFrame({'order_date': [pd.Timestamp(first_day)]})
+    
+    monkeypatch.setattr(database, 'read_warehouse_rows', read_warehouse_rows)
+    return calls
+
+def use_pool(monkeypatch, **kwargs):
+    conn_pool = ConnectionPool(connect=object, **kwargs)
+    monkeypatch.setattr(database, 'get_pool', lambda: conn_pool)
+    return conn_pool
+
+def test_shards_are_capped_at_half_the_pool(monkeypatch, reads):
+    use_pool(monkeypatch, maxconn=6)
+    
+    df = database.read_warehouse_rows_sharded(START, END, shards=8, shard_by="date")
+    
+    assert len(reads) == 3
+    assert len(df) == 3
+    assert min(reads)[0] == START and max(reads)[1] == END
+
+def test_small_pool_reads_unsharded(monkeypatch, reads):
+    use_pool(monkeypatch, maxconn=1)
+    
+    database.read_warehouse_rows_sharded(START, END, shards=4, shard_by="date")
+    
+    assert reads == [(START, END)]
+
+def test_exhausted_pool_falls_back_to_one_query(monkeypatch, reads):
+    use_pool(monkeypatch, maxconn=8)
+    record = database.read_warehouse_rows
+    
+    def read_warehouse_rows(first_day, last_day, **kwargs):
+        if (first_day, last_day) != (START, END):
+            raise PoolTimeout("timed out waiting for a database connection")
+        return record(first_day, last_day, **kwargs)
+    
+    monkeypatch.setattr(database, 'read_warehouse_rows', read_warehouse_rows)
+    
+    df = database.read_warehouse_rows_sharded(START, END, shards=4, shard_by="date")
+    
+    assert reads == [(START, END)]
+    assert len(df) == 1
+
+def test_checkout_timeout_is_not_reported_as_database_down(monkeypatch):
+    conn_pool = use_pool(monkeypatch, maxconn=1, checkout_timeout=0.01)
+    conn_pool.getconn()
+    
+    with pytest.raises(PoolTimeout):
+        database.get_db_connection()
@@ -1,6 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime
+import functools
+import json
+import os
+import re
 
 def get_date_range(days=30):
     """
@@ -10,29 +15,128 @@ def get_date_range(days=30):
     start_date = end_date - datetime.timedelta(days=days)
     return start_date, end_date
 
+# Preset shown first that applies no filter
+ALL_TEAMS = "All Teams"
+
+# Team presets config: each preset lists, per column, case-insensitive
+# substrings; a row belongs to the preset if any of its columns matches
+TEAM_PRESETS_FILE = os.getenv(
+    "TEAM_PRESETS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "team_presets.json")
+)
+
+# SQL expressions for the columns presets can filter on in the database, in
+# the warehouse/orders/products join; presets on other columns are
+# filtered in pandas
+TEAM_FILTER_SQL_COLUMNS = {
+    'warehouse_name': 'w.warehouse_name',
+    'warehouse_location': 'w.warehouse_location',
+    'team_assignment': 'w.team_assignment',
+    'order_status': 'o.order_status',
+    'product_name': 'p.product_name',
+    'product_category': 'p.product_category',
+    'brand': 'p.brand',
+}
+
+@functools.lru_cache(maxsize=4)
+def _load_team_presets(path, mtime):
+    # mtime only keys the cache so edits to the file are picked up
+    with open(path) as f:
+        config = json.load(f)
+    
+    presets = {}
+    for preset in config.get("presets", []):
+        # Compile each column's substrings into one case-insensitive pattern
+        presets[preset["name"]] = {
+            column: "|".join(re.escape(term) for term in terms)
+            for column, terms in preset.get("match", {}).items()
+            if terms
+        }
+        
+        unmapped = sorted(set(presets[preset["name"]]) - set(TEAM_FILTER_SQL_COLUMNS))
+        if unmapped:
+            print(f"Team preset {preset['name']!r} matches on {', '.join(unmapped)}, "
+                  "which can't be filtered in SQL; it will be filtered in pandas instead")
+    return presets
+
+def get_team_filters():
+    """
+    Return {preset name: {column: regex pattern}} loaded from TEAM_PRESETS_FILE
+    """
+    try:
+        mtime = os.path.getmtime(TEAM_PRESETS_FILE)
+    except OSError:
+        st.warning(f"Team presets file not found: {TEAM_PRESETS_FILE}")
+        return {}
+    return _load_team_presets(TEAM_PRESETS_FILE, mtime)
+
+def get_team_presets():
+    """
+    Return the preset names for the team selector, "All Teams" first
+    """
+    return [ALL_TEAMS] + [name for name in get_team_filters() if name != ALL_TEAMS]
+
+@functools.lru_cache(maxsize=256)
+def _category_matches(pattern, categories):
+    """
+    Regex-match each distinct value once; returns a boolean array aligned
+    with categories plus a trailing False for missing values (code -1)
+    """
+    matches = pd.Series(categories, dtype=object).str.contains(pattern, case=False, na=False)
+    return np.append(matches.to_numpy(dtype=bool), False)
+
+def compile_team_filter(df, team_preset):
+    """
+    Compile a team preset against a frame's columns into
+    {column: (row codes, boolean lookup over the codes)}, or None if the
+    preset doesn't filter
+    """
+    filters = get_team_filters().get(team_preset)
+    if not filters:
+        return None
+    
+    compiled = {}
+    for column, pattern in filters.items():
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            categories = tuple(values.cat.categories)
+        else:
+            codes, uniques = pd.factorize(values)
+            categories = tuple(uniques)
+        compiled[column] = (codes, _category_matches(pattern, categories))
+    return compiled
+
 def filter_data_by_team(df, team_preset):
     """
     Filter data based on team preset
     """
-    if team_preset == "All Teams":
+    compiled = compile_team_filter(df, team_preset)
+    if compiled is None:
+        # "All Teams" or unknown preset - return original dataframe
         return df
     
-    if team_preset == "Brand Team":
-        # Filter for brand-related data
-        return df[df['team_assignment'].str.contains('Brand', case=False, na=False) | 
-                  df['product_category'].str.contains('Premium|Luxury', case=False, na=False)]
-    
-    elif team_preset == "Performance Team":
-        # Filter for operational performance data
-        return df[df['team_assignment'].str.contains('Performance|Operations', case=False, na=False)]
+    mask = np.zeros(len(df), dtype=bool)
+    for codes, lookup in compiled.values():
+        mask |= lookup[codes]
     
-    elif team_preset == "Social Media Team":
-        # Filter for social media promotion-related data
-        return df[df['team_assignment'].str.contains('Social|Marketing', case=False, na=False) |
-                  df['product_category'].str.contains('Featured|Campaign', case=False, na=False)]
+    return df[mask]
+
+def team_filter_sql(team_preset, columns=None):
+    """
+    Translate a team preset into a SQL predicate and its parameters.
+    Uses PostgreSQL's case-insensitive regex match so rows are selected the
+    same way as filter_data_by_team.
+    Raises KeyError if the preset matches on a column without a SQL
+    expression in `columns` (TEAM_FILTER_SQL_COLUMNS by default).
+    """
+    filters = get_team_filters().get(team_preset)
+    if not filters:
+        return "TRUE", []
     
-    # Default case - return original dataframe
-    return df
+    columns = columns or TEAM_FILTER_SQL_COLUMNS
+    clauses = [f"{columns[column]} ~* %s" for column in filters]
+    return "(" + " OR ".join(clauses) + ")", list(filters.values())
 
 def format_metric(value, metric_type):
     """
@@ -1,7 +1,8 @@
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
+
+from data_processor import (PROCESS_STAGES, prepare_frame, processing_time_values,
+                            summarize_stage_histogram, summarize_stages)
 
 def create_heatmap(warehouse_performance):
     """
@@ -31,37 +32,20 @@ def create_heatmap(warehouse_performance):
     
     return fig
 
-def create_bottleneck_chart(df):
+def create_bottleneck_chart(df, stages=None, stage_histogram=None):
     """
-    Create a chart showing processing bottlenecks
+    Create a chart showing processing bottlenecks.
+    Uses a stage histogram aggregated in the database, if given, instead of
+    the order rows, with the stages it was binned with unless `stages` is
+    given. Order rows are binned with PROCESS_STAGES by default.
     """
-    if df.empty:
+    if stage_histogram is not None:
+        stage_df = summarize_stage_histogram(stage_histogram, stages)
+    elif df.empty:
         return go.Figure()
-    
-    # Define processing stages (example based on processing time)
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
-    process_stages = {
-        'Order Receipt': [0, 1],
-        'Picking': [1, 3],
-        'Packing': [3, 6],
-        'Quality Check': [6, 10],
-        'Shipping': [10, float('inf')]
-    }
-    
-    # Create stage data
-    stage_data = []
-    for stage, (min_time, max_time) in process_stages.items():
-        stage_count = ((df['processing_time_numeric'] >= min_time) & 
-                      (df['processing_time_numeric'] < max_time)).sum()
-        avg_time = df[(df['processing_time_numeric'] >= min_time) & 
-                      (df['processing_time_numeric'] < max_time)]['processing_time_numeric'].mean()
-        stage_data.append({
-            'stage': stage,
-            'count': stage_count,
-            'avg_time': avg_time if not pd.isna(avg_time) else 0
-        })
-    
-    stage_df = pd.DataFrame(stage_data)
+    else:
+        # Create stage data (stages based on processing time)
+        stage_df = summarize_stages(processing_time_values(df), stages or PROCESS_STAGES)
     
     # Create two subplots
     fig = go.Figure()
@@ -145,30 +129,26 @@ def create_performance_comparison(warehouse_performance):
     
     return fig
 
-def create_time_series_chart(df):
+def create_time_series_chart(df, trend_data=None):
     """
-    Create a time series chart showing performance over time
+    Create a time series chart showing performance over time.
+    Uses daily trend data aggregated in the database, if given, instead of
+    the order rows.
     """
-    if df.empty:
+    if trend_data is not None:
+        time_data = trend_data
+    elif df.empty:
         return go.Figure()
-    
-    # Ensure date formats
-    if df['order_date'].dtype != 'datetime64[ns]':
-        df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-    
-    # Create date column
-    df['date'] = df['order_date'].dt.date
-    
-    # Ensure processing_time is numeric
-    df['processing_time_numeric'] = pd.to_numeric(df['processing_time'], errors='coerce')
-    
-    # Group by date
-    time_data = df.groupby('date').agg({
-        'processing_time_numeric': 'mean',
-        'order_id': 'count'
-    }).reset_index()
-    
-    time_data.columns = ['date', 'avg_processing_time', 'order_count']
+    else:
+        df = prepare_frame(df)
+        
+        # Group by date
+        time_data = df.groupby('date').agg({
+            'processing_time_numeric': 'mean',
+            'order_id': 'count'
+        }).reset_index()
+        
+        time_data.columns = ['date', 'avg_processing_time', 'order_count']
     
     # Create figure with secondary y-axis
     fig = go.Figure()